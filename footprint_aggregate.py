@@ -0,0 +1,280 @@
+# Part 15
+# Constant-memory population statistics per category
+# Author: Yian Bian 260886212
+
+import math
+
+from footprint_model import CATEGORY_NAMES
+
+COLUMNS = CATEGORY_NAMES + ['Total']
+RELATIVE_ACCURACY = 0.01
+MAX_BUCKETS = 2048
+
+
+#################################################
+
+class RunningStats:
+    '''Exact count, sum, mean, variance, minimum and maximum of a stream
+    of numbers, in constant memory (Welford's update), mergeable with the
+    statistics of another part of the stream (Chan et al.).
+
+    >>> a, b = RunningStats(), RunningStats()
+    >>> for x in [1, 2, 3]: a.add(x)
+    >>> for x in [4, 5]: b.add(x)
+    >>> a.merge(b); (a.n, a.total, a.mean, a.variance(), a.low, a.high)
+    (5, 15.0, 3.0, 2.0, 1.0, 5.0)
+    '''
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.low = math.inf
+        self.high = -math.inf
+
+    def add(self, x):
+        '''(RunningStats, num) -> NoneType
+        Add the number x.'''
+        self.n += 1
+        self.total += x
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        if x < self.low:
+            self.low = float(x)
+        if x > self.high:
+            self.high = float(x)
+
+    def merge(self, other):
+        '''(RunningStats, RunningStats) -> NoneType
+        Add every number other has seen.'''
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+        self.total += other.total
+        self.low = min(self.low, other.low)
+        self.high = max(self.high, other.high)
+
+    def variance(self, sample=False):
+        '''(RunningStats, bool) -> float
+        Return the population variance, or the sample variance.'''
+        if self.n - sample <= 0:
+            return 0.0
+        return self.m2 / (self.n - sample)
+
+    def to_dict(self):
+        '''(RunningStats) -> dict
+        Return the state as plain data, e.g. to send it to another process.'''
+        return {'n': self.n, 'total': self.total, 'mean': self.mean, 'm2': self.m2,
+                'low': self.low, 'high': self.high}
+
+    @classmethod
+    def from_dict(cls, d):
+        '''(dict) -> RunningStats
+        Return the statistics saved by to_dict.'''
+        stats = cls()
+        stats.__dict__.update(d)
+        return stats
+
+
+class QuantileSketch:
+    '''Approximate quantiles of a stream of non-negative numbers with a
+    relative error of at most relative_accuracy, in memory bounded by
+    max_buckets: numbers are counted in logarithmically sized buckets.
+    Sketches merge exactly by adding their bucket counts.
+
+    >>> sketch = QuantileSketch()
+    >>> for x in range(1, 1001): sketch.add(x)
+    >>> [round(sketch.quantile(q)) for q in [0.5, 0.9, 0.99]]
+    [498, 907, 983]
+    '''
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, max_buckets=MAX_BUCKETS):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.n = 0
+
+    def add(self, x, count=1):
+        '''(QuantileSketch, num, int) -> NoneType
+        Add the number x, count times.
+
+        >>> QuantileSketch().add(-1)
+        Traceback (most recent call last):
+        ValueError: a quantile sketch only takes numbers >= 0, not -1
+        '''
+        if x < 0:
+            raise ValueError('a quantile sketch only takes numbers >= 0, not ' + str(x))
+        self.n += count
+        if x == 0:
+            self.zeros += count
+            return
+        key = math.ceil(math.log(x) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        '''(QuantileSketch) -> NoneType
+        Fold the smallest buckets together until the limit is respected,
+        losing accuracy only on the lowest quantiles.'''
+        keys = sorted(self.buckets)
+        extra = len(keys) - self.max_buckets
+        merged = sum(self.buckets.pop(key) for key in keys[:extra])
+        self.buckets[keys[extra]] += merged
+
+    def merge(self, other):
+        '''(QuantileSketch, QuantileSketch) -> NoneType
+        Add every number other has seen.'''
+        if other.gamma != self.gamma:
+            raise ValueError('cannot merge sketches of different accuracy')
+        self.n += other.n
+        self.zeros += other.zeros
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q):
+        '''(QuantileSketch, float) -> float
+        Return the approximate q-quantile (0 <= q <= 1), or nan if empty.'''
+        if self.n == 0:
+            return math.nan
+        rank = q * (self.n - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_dict(self):
+        '''(QuantileSketch) -> dict
+        Return the state as plain data, e.g. to send it to another process.'''
+        return {'relative_accuracy': self.relative_accuracy, 'max_buckets': self.max_buckets,
+                'zeros': self.zeros, 'n': self.n,
+                'buckets': [[key, count] for key, count in sorted(self.buckets.items())]}
+
+    @classmethod
+    def from_dict(cls, d):
+        '''(dict) -> QuantileSketch
+        Return the sketch saved by to_dict.'''
+        sketch = cls(d['relative_accuracy'], d['max_buckets'])
+        sketch.zeros = d['zeros']
+        sketch.n = d['n']
+        sketch.buckets = {key: count for key, count in d['buckets']}
+        return sketch
+
+
+#################################################
+
+class PopulationAggregate:
+    '''Streaming statistics of the six categories and their total over a
+    scored population. Results are added one person at a time as they are
+    produced; aggregates built by separate workers or shards merge into
+    one, and travel between processes through to_dict / from_dict.
+
+    >>> agg = PopulationAggregate()
+    >>> agg.add([1.0, 2.0, 3.0, 4.0, 5.0, 6.0]); agg.add([3.0, 2.0, '', 4.0, 5.0, 6.0])
+    >>> other = PopulationAggregate.from_dict(agg.to_dict())
+    >>> agg.merge(other)
+    >>> report = agg.report()
+    >>> report['Utilities']['count'], report['Utilities']['mean'], report['Utilities']['variance']
+    (4, 2.0, 1.0)
+    >>> report['Computing']['count'], report['Total']['sum']
+    (2, 82.0)
+    '''
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.stats = [RunningStats() for name in COLUMNS]
+        self.sketches = [QuantileSketch(relative_accuracy) for name in COLUMNS]
+
+    def add(self, results):
+        '''(PopulationAggregate, lst) -> NoneType
+        Add the results of one person ('' or nan for a section left
+        empty, as scored from an input file or from a population).
+
+        >>> aggregate = PopulationAggregate()
+        >>> aggregate.add([1.0, float('nan'), '', 2.0, 0.0, 0.0])
+        >>> aggregate.report()['University']['count'], aggregate.report()['Total']['mean']
+        (0, 3.0)
+        '''
+        total = 0.0
+        for stats, sketch, r in zip(self.stats, self.sketches, results):
+            if r != '' and r == r:
+                stats.add(r)
+                sketch.add(r)
+                total += r
+        self.stats[-1].add(total)
+        self.sketches[-1].add(total)
+
+    def add_all(self, records):
+        '''(PopulationAggregate, iterable of (str, lst)) -> PopulationAggregate
+        Add the results of every (header, results) in records, as yielded
+        by calculate_footprints_from_stream, and return self.'''
+        for header, results in records:
+            self.add(results)
+        return self
+
+    def merge(self, other):
+        '''(PopulationAggregate, PopulationAggregate) -> NoneType
+        Add every person other has seen.'''
+        for mine, theirs in zip(self.stats + self.sketches, other.stats + other.sketches):
+            mine.merge(theirs)
+
+    def report(self, quantiles=(0.5, 0.9, 0.99)):
+        '''(PopulationAggregate, tuple of float) -> dict
+        Return for every category and the total its count, sum, mean,
+        variance, minimum, maximum and approximate quantiles. A quantile is
+        kept within the exact minimum and maximum, which the sketch's
+        bucket midpoints can overshoot.
+
+        >>> aggregate = PopulationAggregate()
+        >>> aggregate.add([10.887, '', '', '', '', ''])
+        >>> entry = aggregate.report()['Utilities']
+        >>> entry['p50'] == entry['max']
+        True
+        '''
+        report = {}
+        for name, stats, sketch in zip(COLUMNS, self.stats, self.sketches):
+            entry = {'count': stats.n, 'sum': stats.total, 'mean': stats.mean,
+                     'variance': stats.variance(), 'min': stats.low, 'max': stats.high}
+            for q in quantiles:
+                value = sketch.quantile(q)
+                if stats.n:
+                    value = min(max(value, stats.low), stats.high)
+                entry['p' + str(round(q * 100))] = value
+            report[name] = entry
+        return report
+
+    def to_dict(self):
+        '''(PopulationAggregate) -> dict
+        Return the state as plain data, e.g. to send it to another process.'''
+        return {'stats': [s.to_dict() for s in self.stats],
+                'sketches': [s.to_dict() for s in self.sketches]}
+
+    @classmethod
+    def from_dict(cls, d):
+        '''(dict) -> PopulationAggregate
+        Return the aggregate saved by to_dict.'''
+        aggregate = cls()
+        aggregate.stats = [RunningStats.from_dict(s) for s in d['stats']]
+        aggregate.sketches = [QuantileSketch.from_dict(s) for s in d['sketches']]
+        return aggregate
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
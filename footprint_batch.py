@@ -0,0 +1,187 @@
+# Part 6
+# Batch scoring of whole populations
+# Author: Yian Bian 260886212
+
+from operator import mul
+
+import footprint_instrument as instrument
+from footprint_model import MODEL, FootprintModel
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, fall back to plain lists
+    np = None
+
+
+#################################################
+
+# the batch functions read their weights from MODEL on every call, so they
+# follow footprint_model.use_factors
+UTILITIES, STUDIES, COMPUTING, DIET, TRANSPORTATION, TRAVEL = range(6)
+
+
+def _linear(columns, weights, intercept):
+    '''(list of sequence, tuple, float) -> sequence
+    Return intercept + sum(weight * column) for every row of columns in one
+    pass. The columns are numpy arrays when numpy is available, otherwise
+    any sequences of numbers (lists, array.array, memoryview, ...).
+
+    >>> [float(x) for x in _linear([[1, 2], [10, 20]], (1.0, 0.5), 3.0)]
+    [9.0, 15.0]
+    '''
+    if len(columns) != len(weights):
+        raise TypeError('expected ' + str(len(weights)) + ' columns, got ' + str(len(columns)))
+    if np is not None:
+        total = intercept
+        for weight, column in zip(weights, columns):
+            total = total + weight * np.asarray(column, dtype=float)
+        return total
+    return [intercept + sum(map(mul, weights, row)) for row in zip(*columns)]
+
+
+#################################################
+
+def fp_of_utilities_batch(daily_hydro, monthly_gas):
+    '''(seq, seq) -> seq
+    Vectorized fp_of_utilities over columns of daily hydro (kWh) and
+    monthly gas bills ($).
+
+    >>> [float(round(x, 4)) for x in fp_of_utilities_batch([0, 100, 0, 50], [0, 0, 100, 20])]
+    [0.0, 0.0219, 4.7627, 0.9635]
+    '''
+    return _linear([daily_hydro, monthly_gas], MODEL.coefficients[UTILITIES], MODEL.intercepts[UTILITIES])
+
+
+def fp_of_studies_batch(annual_uni_credits):
+    '''(seq) -> seq
+    Vectorized fp_of_studies over a column of annual university credits.
+
+    >>> [float(round(x, 4)) for x in fp_of_studies_batch([0, 30, 18])]
+    [0.0, 1.12, 0.672]
+    '''
+    return _linear([annual_uni_credits], MODEL.coefficients[STUDIES], MODEL.intercepts[STUDIES])
+
+
+def fp_of_computing_batch(daily_online_use, daily_phone_use, new_light_devices, new_medium_devices, new_heavy_devices):
+    '''(seq, seq, seq, seq, seq) -> seq
+    Vectorized fp_of_computing over columns of its five arguments.
+
+    >>> [float(round(x, 4)) for x in fp_of_computing_batch([0, 6, 4], [0, 0, 2], [0, 0, 2], [0, 0, 1], [0, 0, 1])]
+    [0.0, 0.1205, 3.7304]
+    '''
+    return _linear([daily_online_use, daily_phone_use, new_light_devices, new_medium_devices, new_heavy_devices],
+                   MODEL.coefficients[COMPUTING], MODEL.intercepts[COMPUTING])
+
+
+def fp_of_diet_batch(daily_g_meat, daily_g_cheese, daily_L_milk, daily_num_eggs):
+    '''(seq, seq, seq, seq) -> seq
+    Vectorized fp_of_diet over columns of its four arguments.
+
+    >>> [float(round(x, 4)) for x in fp_of_diet_batch([0, 25, 126], [0, 0, 293.52], [0, 0, 1], [0, 0, 1])]
+    [1.0556, 1.3003, 3.7827]
+    '''
+    return _linear([daily_g_meat, daily_g_cheese, daily_L_milk, daily_num_eggs], MODEL.coefficients[DIET], MODEL.intercepts[DIET])
+
+
+def fp_of_transportation_batch(weekly_bus_rides, weekly_rail_rides, weekly_uber_rides, weekly_km_driven):
+    '''(seq, seq, seq, seq) -> seq
+    Vectorized fp_of_transportation over columns of its four arguments.
+
+    >>> [float(round(x, 4)) for x in fp_of_transportation_batch([0, 2, 1], [0, 2, 2], [0, 1, 3], [0, 10, 4])]
+    [0.0, 0.3354, 0.3571]
+    '''
+    return _linear([weekly_bus_rides, weekly_rail_rides, weekly_uber_rides, weekly_km_driven],
+                   MODEL.coefficients[TRANSPORTATION], MODEL.intercepts[TRANSPORTATION])
+
+
+def fp_of_travel_batch(annual_long_flights, annual_short_flights, annual_train, annual_coach, annual_hotels):
+    '''(seq, seq, seq, seq, seq) -> seq
+    Vectorized fp_of_travel over columns of its five arguments.
+
+    >>> [float(round(x, 4)) for x in fp_of_travel_batch([0, 6, 1], [0, 4, 2], [0, 24, 3], [0, 2, 4], [0, 2000, 5])]
+    [0.0, 15.4034, 3.2304]
+    '''
+    return _linear([annual_long_flights, annual_short_flights, annual_train, annual_coach, annual_hotels],
+                   MODEL.coefficients[TRAVEL], MODEL.intercepts[TRAVEL])
+
+
+BATCH_FUNCTIONS = [fp_of_utilities_batch, fp_of_studies_batch, fp_of_computing_batch,
+                   fp_of_diet_batch, fp_of_transportation_batch, fp_of_travel_batch]
+
+
+def calculate_footprint_batch(columns, model=None):
+    '''(list of list of seq, FootprintModel) -> list of seq
+    Score a whole population at once. columns holds, for each of the six
+    categories (in the order of calculate_footprint_from_input), one column
+    per argument of that category's function. Return one result column per
+    category, under the emission factors of model (MODEL by default).
+
+    >>> columns = [[[48.8, 0], [20, 0]], [[30, 0]], [[4, 0], [2, 0], [2, 0], [1, 0], [1, 0]],
+    ...            [[25, 0], [0, 0], [1, 0], [1, 0]], [[2, 0], [2, 0], [1, 0], [10, 0]],
+    ...            [[1, 0], [2, 0], [3, 0], [4, 0], [5, 0]]]
+    >>> [[float(round(x, 4)) for x in col] for col in calculate_footprint_batch(columns)]
+    [[0.9632, 0.0], [1.12, 0.0], [3.7304, 0.0], [1.5076, 1.0556], [0.3354, 0.0], [3.2304, 0.0]]
+    '''
+    if len(columns) != len(BATCH_FUNCTIONS):
+        raise TypeError('expected columns for ' + str(len(BATCH_FUNCTIONS)) + ' categories')
+    if model is not None and model is not MODEL:
+        return [_linear(cols, weights, intercept)
+                for cols, weights, intercept in zip(columns, model.coefficients, model.intercepts)]
+    if instrument.ENABLED:
+        results = []
+        for fun, cols in zip(BATCH_FUNCTIONS, columns):
+            with instrument.stage(fun.__name__, rows=len(cols[0]) if cols else 0):
+                results.append(fun(*cols))
+        return results
+    return [fun(*cols) for fun, cols in zip(BATCH_FUNCTIONS, columns)]
+
+
+def calculate_footprint_people(people):
+    '''(list of list of lst) -> list of lst
+    Score many people in one pass per category, from the arguments of each
+    of their six sections (the shape read by read_sections_from_stream).
+    Like calculate_section, a section left empty gives ''.
+
+    >>> people = [[[48.8, 20], [30], [], [25, 0, 1, 1], [], []], [[0, 0], [18], [], [], [], []]]
+    >>> [[r if r == '' else float(round(r, 4)) for r in results] for results in calculate_footprint_people(people)]
+    [[0.9632, 1.12, '', 1.5076, '', ''], [0.0, 0.672, '', '', '', '']]
+    '''
+    results = [['']*len(BATCH_FUNCTIONS) for sections in people]
+    for i, (start, end) in enumerate(MODEL.slices):
+        rows = [p for p, sections in enumerate(people) if len(sections[i])]
+        if not rows:
+            continue
+        for p in rows:
+            if len(people[p][i]) != end - start:
+                raise TypeError(BATCH_FUNCTIONS[i].__name__ + ' takes ' + str(end - start)
+                                + ' values, got ' + str(len(people[p][i])))
+        columns = [[people[p][i][j] for p in rows] for j in range(end - start)]
+        for p, value in zip(rows, BATCH_FUNCTIONS[i](*columns)):
+            results[p][i] = float(value)
+    return results
+
+
+def rescore_population(population, table):
+    '''(object, FactorTable) -> list of seq
+    Return the result columns of population (a ColumnarPopulation, a
+    footprint_records.Population or anything with category_columns) under
+    the emission factors of table, in one pass per category over the stored
+    inputs, without touching the factors the process is using.
+
+    >>> from footprint_factors import FactorTable
+    >>> columns = [[[48.8], [20]], [[30]], [[4], [2], [2], [1], [1]], [[25], [0], [1], [1]],
+    ...            [[2], [2], [1], [10]], [[1], [2], [3], [4], [5]]]
+    >>> class Stored:
+    ...     def category_columns(self):
+    ...         return columns
+    >>> [float(round(col[0], 4)) for col in rescore_population(Stored(), FactorTable('2', {'long_flight_lb': 0}))]
+    [0.9632, 1.12, 3.7304, 1.5076, 0.3354, 1.2346]
+    '''
+    return calculate_footprint_batch(population.category_columns(), FootprintModel(table=table))
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
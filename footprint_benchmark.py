@@ -0,0 +1,321 @@
+# Part 12
+# Benchmarks of parsing, the category functions and whole runs
+# Author: Yian Bian 260886212
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+from contextlib import redirect_stdout
+
+import unit_conversion
+from footprint_calculator import (footprint_calculator, calculate_footprint_from_input,
+                                  calculate_footprints_from_stream, read_sections_from_stream,
+                                  output_results)
+from footprint_model import MODEL, CATEGORY_FUNCTIONS
+from footprint_batch import calculate_footprint_batch
+
+SCALES = [1000, 100000, 1000000]
+SEED = 260886212
+IMPORT_MODULES = ['footprint_calculator', 'footprint_batch']
+BATCH_CHUNK = 1000 # people per timed call of the batch engine
+IMPORT_BUDGET_MS = 20.0 # median time to import footprint_calculator and score a section
+# what a real run does right after importing each module: the category
+# modules are only loaded by the first section scored
+FIRST_CALLS = {'footprint_calculator': 'footprint_calculator.calculate_section(0, [1.0, 1.0])',
+               'footprint_batch': 'footprint_batch.calculate_footprint_people([[[1.0, 1.0]] + [[]] * 5])'}
+CONVERSIONS = ['kg_to_tonnes', 'pound_to_kg', 'km_to_miles', 'daily_to_annual',
+               'weekly_to_annual', 'annual_to_daily']
+
+
+#################################################
+
+def percentile(ordered, p):
+    '''(list of num, num) -> num
+    Return the p-th percentile of the sorted list ordered (nearest rank).
+
+    >>> percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 50)
+    5
+    >>> percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 99)
+    10
+    '''
+    rank = max(int(-(-p * len(ordered) // 100)), 1) # ceil without floats
+    return ordered[rank - 1]
+
+
+def summarize(name, n, seconds, latencies):
+    '''(str, int, float, list of float) -> dict
+    Return the report entry of a benchmark that processed n items in
+    seconds, with latencies the time in seconds of each item (or of each
+    timed group of items, already divided by the group size).
+
+    >>> summarize('x', 4, 2.0, [0.5, 0.5, 0.5, 0.5])['throughput_per_s']
+    2.0
+    '''
+    ordered = sorted(latencies)
+    return {'name': name, 'n': n, 'seconds': seconds,
+            'throughput_per_s': n / seconds if seconds else float('inf'),
+            'p50_us': percentile(ordered, 50) * 1e6,
+            'p90_us': percentile(ordered, 90) * 1e6,
+            'p99_us': percentile(ordered, 99) * 1e6}
+
+
+def time_calls(name, fun, args, number=1000, repeat=50):
+    '''(str, function, list, int, int) -> dict
+    Time repeat groups of number calls of fun(*args); a group's time
+    divided by number is one latency sample.'''
+    latencies = []
+    total = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fun(*args)
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        latencies.append(elapsed / number)
+    return summarize(name, number * repeat, total, latencies)
+
+
+def random_sections(rng):
+    '''(Random) -> list of list of float
+    Return made-up answers to all six sections for one person.'''
+    return [[round(rng.uniform(0, 10), 2) for _ in range(end - start)] for start, end in MODEL.slices]
+
+
+def write_people(f, n, rng):
+    '''(file, int, Random) -> NoneType
+    Write n made-up people to the open file f in the input file layout.'''
+    for i in range(n):
+        f.write('person ' + str(i) + '\n--------\n')
+        for args in random_sections(rng):
+            for name, val in zip(MODEL.inputs, args):
+                f.write(name + ',' + str(val) + '\n')
+            f.write('--------\n')
+
+
+#################################################
+
+def bench_conversions():
+    '''() -> list of dict
+    Benchmark every unit_conversion helper.'''
+    return [time_calls('unit_conversion.' + name, getattr(unit_conversion, name), [123.4])
+            for name in CONVERSIONS]
+
+
+def bench_categories(rng):
+    '''(Random) -> list of dict
+    Benchmark every fp_of_* function.'''
+    sections = random_sections(rng)
+    return [time_calls(fun.__name__, fun, args) for fun, args in zip(CATEGORY_FUNCTIONS, sections)]
+
+
+def bench_parsing(rng, directory):
+    '''(Random, str) -> list of dict
+    Benchmark calculate_footprint_from_input and footprint_calculator on
+    one input file.'''
+    fname = os.path.join(directory, 'one.csv')
+    with open(fname, 'w') as f:
+        write_people(f, 1, rng)
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        return [time_calls('calculate_footprint_from_input', calculate_footprint_from_input, [fname], 100),
+                time_calls('footprint_calculator', footprint_calculator, [fname], 100)]
+
+
+def bench_scale(n, rng, directory):
+    '''(int, Random, str) -> list of dict
+    Benchmark end-to-end scoring of a file of n people: streaming them
+    through the scalar functions and printing every result, and scoring
+    the same people with the batch engine, a chunk of at most BATCH_CHUNK
+    people (and at least 10 chunks) per timed call.'''
+    fname = os.path.join(directory, 'people_' + str(n) + '.csv')
+    with open(fname, 'w') as f:
+        write_people(f, n, rng)
+
+    latencies = []
+    with open(fname, 'r') as f, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        start = last = time.perf_counter()
+        for header, results in calculate_footprints_from_stream(f):
+            output_results(results)
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+        total = last - start
+    reports = [summarize('end_to_end.' + str(n), n, total, latencies)]
+
+    columns = [array('d') for name in MODEL.inputs]
+    with open(fname, 'r') as f:
+        for header, sections in read_sections_from_stream(f):
+            for column, val in zip(columns, [val for args in sections for val in args]):
+                column.append(val)
+    size = min(BATCH_CHUNK, max(1, n // 10))
+    chunks = [[[column[i:i + size] for column in columns[start:end]] for start, end in MODEL.slices]
+              for i in range(0, n, size)]
+    latencies = []
+    total = 0.0
+    for chunk in chunks:
+        start = time.perf_counter()
+        calculate_footprint_batch(chunk)
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        latencies.append(elapsed / len(chunk[0][0]))
+    reports.append(summarize('batch.' + str(n), n, total, latencies))
+    os.remove(fname)
+    return reports
+
+
+def import_time(module):
+    '''(str) -> (float, float)
+    Import module in a fresh interpreter. Return the seconds spent
+    importing it, as reported by python -X importtime, and the seconds the
+    whole process took.'''
+    start = time.perf_counter()
+    done = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                          capture_output=True, text=True, check=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    wall = time.perf_counter() - start
+    for line in done.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6, wall
+    raise ValueError('no import time reported for ' + module)
+
+
+def first_call_time(module):
+    '''(str) -> float
+    Import module in a fresh interpreter and make its first call of
+    FIRST_CALLS, loading whatever that needs. Return the seconds both took.'''
+    code = ('import time; start = time.perf_counter(); import ' + module + '; '
+            + FIRST_CALLS[module] + '; print(time.perf_counter() - start)')
+    done = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(done.stdout)
+
+
+def bench_import(module, repeat=20):
+    '''(str, int) -> list of dict
+    Benchmark importing module, starting a process that does only that,
+    and importing it and making its first call, repeat times.'''
+    imports = []
+    processes = []
+    calls = []
+    for _ in range(repeat):
+        seconds, wall = import_time(module)
+        imports.append(seconds)
+        processes.append(wall)
+        calls.append(first_call_time(module))
+    return [summarize('import.' + module, repeat, sum(imports), imports),
+            summarize('startup.' + module, repeat, sum(processes), processes),
+            summarize('first_call.' + module, repeat, sum(calls), calls)]
+
+
+def over_budget(report, budget_ms=IMPORT_BUDGET_MS, module='footprint_calculator'):
+    '''(dict, float, str) -> list of str
+    Return a line if the median time to import module and make its first
+    call (see FIRST_CALLS) in report is over budget_ms milliseconds: the
+    part of a real run's startup the calculator controls.
+
+    >>> report = {'benchmarks': [{'name': 'first_call.footprint_calculator', 'p50_us': 31000.0}]}
+    >>> over_budget(report, 20)
+    ['first_call.footprint_calculator: 31.0 ms, budget 20 ms']
+    >>> over_budget(report, 40)
+    []
+    '''
+    lines = []
+    for b in report['benchmarks']:
+        if b['name'] == 'first_call.' + module and b['p50_us'] > budget_ms * 1000:
+            lines.append(b['name'] + ': ' + str(round(b['p50_us'] / 1000, 1)) + ' ms, budget '
+                         + str(budget_ms) + ' ms')
+    return lines
+
+
+def run(scales=SCALES, seed=SEED, import_only=False):
+    '''(list of int, int, bool) -> dict
+    Run the whole suite, or only the import benchmarks, and return the
+    report.'''
+    rng = random.Random(seed)
+    benchmarks = []
+    for module in IMPORT_MODULES:
+        benchmarks += bench_import(module)
+    if import_only:
+        scales = []
+    else:
+        benchmarks += bench_conversions() + bench_categories(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        if not import_only:
+            benchmarks += bench_parsing(rng, directory)
+        for n in scales:
+            benchmarks += bench_scale(n, rng, directory)
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'factor_version': MODEL.factor_version, 'seed': seed, 'benchmarks': benchmarks}
+
+
+def compare(old, new, tolerance=0.10):
+    '''(dict, dict, float) -> list of str
+    Return a line for every benchmark of report new whose throughput is
+    more than tolerance (a fraction) below the same benchmark in report old.
+
+    >>> old = {'benchmarks': [{'name': 'a', 'throughput_per_s': 100.0}]}
+    >>> compare(old, {'benchmarks': [{'name': 'a', 'throughput_per_s': 80.0}]})
+    ['a: 100 -> 80 per second (-20.0%)']
+    >>> compare(old, {'benchmarks': [{'name': 'a', 'throughput_per_s': 95.0}]})
+    []
+    '''
+    before = {b['name']: b['throughput_per_s'] for b in old['benchmarks']}
+    regressions = []
+    for b in new['benchmarks']:
+        if b['name'] in before and b['throughput_per_s'] < before[b['name']] * (1 - tolerance):
+            change = (b['throughput_per_s'] / before[b['name']] - 1) * 100
+            regressions.append(b['name'] + ': ' + str(round(before[b['name']])) + ' -> '
+                               + str(round(b['throughput_per_s'])) + ' per second ('
+                               + str(round(change, 1)) + '%)')
+    return regressions
+
+
+def main(argv):
+    '''(list of str) -> int
+    Command line entry point. Write the report as JSON. Return 1 if
+    importing footprint_calculator and scoring a first section takes longer
+    than the import budget or,
+    given a previous report with --baseline, if anything regressed.'''
+    parser = argparse.ArgumentParser(description='Benchmark the footprint calculator.')
+    parser.add_argument('--scales', default=','.join(str(n) for n in SCALES),
+                        help='comma separated numbers of people for the end-to-end runs')
+    parser.add_argument('--output', default='-', help='report file (default: standard output)')
+    parser.add_argument('--baseline', help='previous report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    parser.add_argument('--import-budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--import-only', action='store_true',
+                        help='only benchmark module imports and process startup')
+    options = parser.parse_args(argv)
+
+    report = run([int(n) for n in options.scales.split(',') if n], import_only=options.import_only)
+    text = json.dumps(report, indent=1)
+    if options.output == '-':
+        print(text)
+    else:
+        with open(options.output, 'w') as f:
+            f.write(text + '\n')
+
+    failures = over_budget(report, options.import_budget_ms)
+    if options.baseline:
+        with open(options.baseline, 'r') as f:
+            failures += compare(json.load(f), report, options.tolerance)
+    for line in failures:
+        print('regression: ' + line, file=sys.stderr)
+    return 1 if failures else 0
+
+
+#################################################
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--doctest':
+        import doctest
+        doctest.testmod()
+    else:
+        sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,150 @@
+# Part 9
+# Content-addressed cache of results
+# Author: Yian Bian 260886212
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+from footprint_calculator import calculate_footprints_from_stream
+import footprint_factors as factors
+
+
+#################################################
+
+def content_key(data, version=None):
+    '''(bytes, str) -> str
+    Return the cache key of an input file with contents data: a hash of
+    the contents and of the emission-factor version they are scored with
+    (that of the ACTIVE table, which scores the file, by default).
+
+    >>> content_key(b'abc', '1') == content_key(b'abc', '1')
+    True
+    >>> content_key(b'abc', '1') == content_key(b'abc', '2')
+    False
+    >>> key = content_key(b'abc')
+    >>> with factors.using(factors.FactorTable('2', {'egg_g': 0})):
+    ...     content_key(b'abc') == key
+    False
+    '''
+    if version is None:
+        version = factors.ACTIVE.version
+    h = hashlib.sha256(version.encode() + b'\0')
+    h.update(data)
+    return h.hexdigest()
+
+
+class FootprintCache:
+    '''A cache of results keyed by content_key, with a bounded in-memory
+    least-recently-used tier of maxsize entries and, when directory is
+    given, a persistent on-disk tier that outlives the process.
+
+    >>> cache = FootprintCache(maxsize=2)
+    >>> cache.put('a', [1.0]); cache.put('b', [2.0]); cache.get('a')
+    [1.0]
+    >>> cache.put('c', [3.0]) # evicts 'b', the least recently used
+    >>> cache.get('b') is None
+    True
+    >>> cache.stats()
+    {'hits': 1, 'misses': 1, 'evictions': 1, 'disk_hits': 0, 'size': 2}
+    '''
+
+    def __init__(self, maxsize=4096, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        '''(FootprintCache, str) -> str
+        Return the on-disk file holding the entry for key.'''
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _remember(self, key, results):
+        '''(FootprintCache, str, lst) -> NoneType
+        Store results in the in-memory tier, evicting the least recently
+        used entry if it is full.'''
+        self.entries[key] = results
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        '''(FootprintCache, str) -> lst
+        Return a copy of the results cached under key, or None.'''
+        results = self.entries.get(key)
+        if results is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return list(results)
+
+        if self.directory is not None:
+            try:
+                with open(self._path(key), 'r') as f:
+                    results = json.load(f)
+            except (OSError, ValueError):
+                results = None
+            if results is not None:
+                self._remember(key, results)
+                self.hits += 1
+                self.disk_hits += 1
+                return list(results)
+
+        self.misses += 1
+        return None
+
+    def put(self, key, results):
+        '''(FootprintCache, str, lst) -> NoneType
+        Cache results under key, in memory and on disk.'''
+        self._remember(key, list(results))
+        if self.directory is not None:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(results, f)
+            os.replace(tmp, path) # readers never see a half-written entry
+
+    def stats(self):
+        '''(FootprintCache) -> dict
+        Return the hit, miss and eviction counters and the number of
+        entries held in memory.'''
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'disk_hits': self.disk_hits, 'size': len(self.entries)}
+
+
+CACHE = FootprintCache()
+
+
+def calculate_footprint_cached(fname, cache=CACHE):
+    '''(str, FootprintCache) -> lst
+    Same as calculate_footprint_from_input, but a file whose contents were
+    already scored under the current emission factors is answered from
+    cache without being parsed or computed again.
+    '''
+    with open(fname, 'rb') as f:
+        data = f.read()
+    key = content_key(data)
+    results = cache.get(key)
+    if results is None:
+        results = ['']*6
+        for header, results in calculate_footprints_from_stream(io.StringIO(data.decode())):
+            break
+        cache.put(key, results)
+    return results
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -2,12 +2,45 @@
 # Footprint of local transportation and travel
 # Author: Yian Bian 260886212
 
-from footprint_services import *
-from footprint_transport import *
-from footprint_consumption import *
+import sys
+import footprint_instrument as instrument
 
 PROMPT = 'Name of person (file must be in same directory): '
 
+# the module and name of the function of every section, in input file
+# order. The modules are only imported once a section needs computing, so
+# starting the calculator stays cheap.
+CATEGORIES = [('footprint_services', 'fp_of_utilities'), ('footprint_services', 'fp_of_studies'),
+              ('footprint_consumption', 'fp_of_computing'), ('footprint_consumption', 'fp_of_diet'),
+              ('footprint_transport', 'fp_of_transportation'), ('footprint_transport', 'fp_of_travel')]
+FUNCTIONS = []
+
+
+def load_functions():
+    '''() -> list of function
+    Import the category modules if needed and return the function of
+    every section. The list is built first and published whole, so another
+    thread never sees FUNCTIONS half filled.
+
+    >>> [fun.__name__ for fun in load_functions()][:2]
+    ['fp_of_utilities', 'fp_of_studies']
+    '''
+    if not FUNCTIONS:
+        FUNCTIONS[:] = [getattr(__import__(module), name) for module, name in CATEGORIES]
+    return FUNCTIONS
+
+
+def __getattr__(name):
+    '''(str) -> object
+    Keep the names this module used to star-import from the category
+    modules (fp_of_diet, ...) available, importing them on first use.'''
+    if not name.startswith('__'):
+        for module in ('footprint_services', 'footprint_transport', 'footprint_consumption'):
+            module = __import__(module)
+            if hasattr(module, name):
+                return getattr(module, name)
+    raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
+
 ########################## 
 def input_filename():
     '''() -> str
@@ -18,7 +51,7 @@ def input_filename():
     >>> input_filename() # enter 'example'
     'example.csv'
     '''
-    name = input(" the name of the person getting their footprint calculated is ") + ".csv"
+    name = input(" the name of the person getting their footprint calculated is ")
     return name + ".csv"
 
 ######################### 
@@ -37,45 +70,143 @@ def calculate_footprint_from_input(fname):
     Read input from file with name fname, call the six relevant functions,
     and return a list with the result for each function.
     '''
-    funs = [fp_of_utilities, fp_of_studies, fp_of_computing, fp_of_diet,
-            fp_of_transportation, fp_of_travel]
-    results = ['']*6
-
     with open(fname, 'r') as f:
-        f.readline() # lose the header
-
-        # for calling the functions
-        curr_fun = -1
-        args = []
+        for header, results in calculate_footprints_from_stream(f):
+            return results
+    return ['']*6
+
+
+def read_sections_from_stream(f):
+    '''(file) -> iterator of (str, lst)
+    Read any number of people from the open file f, one after the other,
+    each as a header line followed by six '--------' separated sections.
+    Yield (header, sections) for every person as soon as their last section
+    is read, where sections holds the list of values read in each of the
+    six sections, so only one person is held in memory at a time.
+
+    >>> import io
+    >>> data = io.StringIO("Alice\\n--------\\n,48.8\\n,20\\n--------\\n,30\\n--------\\n"
+    ...                    "--------\\n--------\\n--------\\n--------\\n"
+    ...                    "Bob\\n--------\\n,0\\n,0\\n--------\\n,18\\n")
+    >>> for header, sections in read_sections_from_stream(data):
+    ...     print(header, sections)
+    Alice [[48.8, 20.0], [30.0], [], [], [], []]
+    Bob [[0.0, 0.0], [18.0], [], [], [], []]
+    '''
+    if instrument.ENABLED:
+        return instrument.timed_iter('parse', _read_sections(instrument.timed_iter('read', f, True)))
+    return _read_sections(f)
+
+
+def _read_sections(f):
+    '''(file) -> generator of (str, lst)
+    The generator behind read_sections_from_stream.'''
+    header = None
+
+    for line in f:
+        if header is None:
+            if line.strip(): # the first line of a person is their header
+                header = line.strip()
+                sections = [[] for category in CATEGORIES]
+                curr_fun = -1
+
+        elif '-'*8 in line:
+            curr_fun += 1
+            if curr_fun == len(CATEGORIES): # that was the last section of this person
+                yield header, sections
+                header = None
+
+        elif curr_fun >= 0:
+            val = line.split(',')[-1].strip()
+            if val:
+                sections[curr_fun].append(float(val))
+
+    if header is not None: # the last person had no closing '--------'
+        yield header, sections
+
+
+def calculate_section(i, args):
+    '''(int, lst) -> float
+    Return the result of the i-th of the six functions called with args,
+    or '' for a section that was left empty.
+
+    >>> calculate_section(1, [30.0])
+    1.12
+    >>> calculate_section(1, [])
+    ''
+    '''
+    if not len(args):
+        return ''
+    fun = (FUNCTIONS or load_functions())[i]
+    if instrument.ENABLED:
+        with instrument.stage(fun.__name__, rows=1):
+            return fun(*args)
+    return fun(*args)
+
+
+def calculate_footprints_from_stream(f):
+    '''(file) -> generator of (str, lst)
+    Same as read_sections_from_stream, but yield (header, results) with
+    the result of each of the six functions for every person.
+
+    >>> import io
+    >>> data = io.StringIO("Alice\\n--------\\n,48.8\\n,20\\n--------\\n,30\\n--------\\n"
+    ...                    "--------\\n--------\\n--------\\n--------\\n"
+    ...                    "Bob\\n--------\\n,0\\n,0\\n--------\\n,18\\n")
+    >>> for header, results in calculate_footprints_from_stream(data):
+    ...     print(header, [r if r == '' else round(r, 4) for r in results])
+    Alice [0.9632, 1.12, '', '', '', '']
+    Bob [0.0, 0.672, '', '', '', '']
+    '''
+    for header, sections in read_sections_from_stream(f):
+        yield header, [calculate_section(i, args) for i, args in enumerate(sections)]
 
-        for line in f:
-            if '-'*8 in line:
-                if len(args):
-                    #print(args, curr_fun)
-                    results[curr_fun] = funs[curr_fun](*args)
-                curr_fun += 1
-                args = []
 
-            else:
-                val = line.split(',')[-1].strip()
-                if val:
-                    args.append(float(val))
-        
-    return results
+def calculate_footprints_from_input(fname='-'):
+    '''(str) -> generator of (str, lst)
+    Stream every person in the file with name fname (or standard input
+    when fname is '-') and yield (header, results) for each of them.
+    '''
+    if fname == '-':
+        yield from calculate_footprints_from_stream(sys.stdin)
+    else:
+        with open(fname, 'r') as f:
+            yield from calculate_footprints_from_stream(f)
 
 
 def output_results(results):
     '''(lst) -> NoneType
     Print out the results.'''
+    if instrument.ENABLED:
+        with instrument.stage('output', rows=1):
+            return _output_results(results)
+    return _output_results(results)
+
+
+def _output_results(results):
+    '''(lst) -> NoneType
+    The printing behind output_results. A section left empty ('') is
+    printed empty and left out of the sum.'''
     names = ['Utilities', 'University', 'Computing', 'Diet', 'Transportation', 'Travel']
     delim = '\t'
-    print('Category', 'Tonnes CO2E (sum: ' + str(round(sum(results),4)) + ')', sep=delim)
+    print('Category', 'Tonnes CO2E (sum: ' + str(round(sum(r for r in results if r != ''),4)) + ')', sep=delim)
     for i, n in enumerate(names):
-        print(names[i] + ' '*(16 - len(names[i])), round(results[i], 4), sep=delim)
+        print(names[i] + ' '*(16 - len(names[i])), '' if results[i] == '' else round(results[i], 4), sep=delim)
+
+
+def main(argv):
+    '''(list of str) -> NoneType
+    Command line entry point: print the footprint of every person in the
+    files named in argv ('-' for standard input), or ask for the name of
+    one file when there are none.'''
+    if not argv:
+        footprint_calculator(input_filename())
+    for fname in argv:
+        for header, results in calculate_footprints_from_input(fname):
+            print(header)
+            output_results(results)
 
 
 if __name__ == '__main__':
-    fname = input_filename()
-    if fname is not INCOMPLETE:
-        footprint_calculator(fname)
+    main(sys.argv[1:])
     
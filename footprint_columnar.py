@@ -0,0 +1,200 @@
+# Part 11
+# Binary columnar file format for whole populations
+# Author: Yian Bian 260886212
+
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+from footprint_calculator import read_sections_from_stream
+from footprint_model import MODEL
+from footprint_batch import calculate_footprint_batch
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, fall back to memoryviews
+    np = None
+
+# File layout: MAGIC, the length of the header as a little-endian uint32
+# and 4 bytes of padding, the JSON header padded with spaces to a multiple
+# of 8 bytes, then every column one after the other as rows little-endian
+# float64 values. A section left empty in the input is stored as NaN.
+MAGIC = b'FPCOL1\n\0'
+PREFIX = struct.Struct('<I4x')
+CHUNK_ROWS = 65536
+
+
+#################################################
+
+def schema(model=MODEL):
+    '''(FootprintModel) -> list of (str, list of str)
+    Return the categories of model with the names of their input columns,
+    in file order.
+
+    >>> schema()[:2]
+    [('Utilities', ['daily_hydro', 'monthly_gas']), ('University', ['annual_uni_credits'])]
+    '''
+    return [(name, model.inputs[start:end]) for name, (start, end) in zip(model.names, model.slices)]
+
+
+def write_columnar(fname, columns, rows, column_names, categories):
+    '''(str, list of file, int, list of str, list) -> NoneType
+    Write a columnar file named fname from the open binary files columns,
+    each holding the rows float64 values of one column.'''
+    header = json.dumps({'rows': rows, 'columns': column_names, 'categories': categories,
+                         'factor_version': MODEL.factor_version}).encode()
+    header += b' ' * (-len(header) % 8) # keep every column 8-byte aligned
+    with open(fname, 'wb') as out:
+        out.write(MAGIC)
+        out.write(PREFIX.pack(len(header)))
+        out.write(header)
+        for column in columns:
+            column.seek(0)
+            shutil.copyfileobj(column, out, 1 << 20)
+
+
+def convert_stream_to_columnar(f, fname, model=MODEL):
+    '''(file, str, FootprintModel) -> int
+    Convert every person in the open input file f (in the layout read by
+    read_sections_from_stream) to a columnar file named fname. Columns are
+    spilled to temporary files every CHUNK_ROWS people, so memory use does
+    not grow with the input. Return the number of people written.
+    '''
+    categories = schema(model)
+    buffers = [array('d') for name in model.inputs]
+    spills = [tempfile.TemporaryFile() for name in model.inputs]
+    little = sys.byteorder == 'little'
+    rows = 0
+
+    def spill():
+        for buf, out in zip(buffers, spills):
+            if not little:
+                buf.byteswap()
+            buf.tofile(out)
+            del buf[:]
+
+    try:
+        for header, sections in read_sections_from_stream(f):
+            for (start, end), args in zip(model.slices, sections):
+                if not args:
+                    args = [float('nan')] * (end - start)
+                elif len(args) != end - start:
+                    raise ValueError(header + ': expected ' + str(end - start) + ' values in a section, got ' + str(len(args)))
+                for buf, val in zip(buffers[start:end], args):
+                    buf.append(val)
+            rows += 1
+            if rows % CHUNK_ROWS == 0:
+                spill()
+        spill()
+        write_columnar(fname, spills, rows, model.inputs, categories)
+    finally:
+        for out in spills:
+            out.close()
+    return rows
+
+
+def convert_csv_to_columnar(csv_name, fname, model=MODEL):
+    '''(str, str, FootprintModel) -> int
+    Convert the input file with name csv_name to a columnar file named
+    fname. Return the number of people written.'''
+    with open(csv_name, 'r') as f:
+        return convert_stream_to_columnar(f, fname, model)
+
+
+class ColumnarPopulation:
+    '''A population loaded from a columnar file. The file is memory-mapped
+    and every column is a zero-copy view of it (a numpy array when numpy is
+    available, otherwise a memoryview of float64), so nothing is read until
+    it is used.
+
+    >>> import io
+    >>> fname = os.path.join(tempfile.mkdtemp(), 'people.fpc')
+    >>> data = io.StringIO("Alice\\n--------\\n,48.8\\n,20\\n--------\\n,30\\n--------\\n"
+    ...                    "--------\\n--------\\n--------\\n--------\\n")
+    >>> convert_stream_to_columnar(data, fname)
+    1
+    >>> with ColumnarPopulation(fname) as population:
+    ...     print(population.rows, population.column('daily_hydro')[0],
+    ...           [float(round(r[0], 4)) for r in population.score()[:2]])
+    1 48.8 [0.9632, 1.12]
+    '''
+
+    def __init__(self, fname):
+        self.file = open(fname, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # an empty file cannot be mapped
+            self.file.close()
+            raise ValueError(fname + ' is not a columnar footprint file')
+        if self.map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(fname + ' is not a columnar footprint file')
+
+        offset = len(MAGIC) + PREFIX.size
+        length, = PREFIX.unpack_from(self.map, len(MAGIC))
+        header = json.loads(self.map[offset:offset + length].decode())
+        offset += length
+
+        self.rows = header['rows']
+        self.names = header['columns']
+        self.categories = header['categories']
+        self.factor_version = header['factor_version']
+        self.columns = []
+        view = memoryview(self.map)
+        for name in self.names:
+            if np is not None:
+                column = np.frombuffer(self.map, dtype='<f8', count=self.rows, offset=offset)
+            elif sys.byteorder == 'little':
+                column = view[offset:offset + 8 * self.rows].cast('d')
+            else:
+                column = array('d', view[offset:offset + 8 * self.rows])
+                column.byteswap()
+            self.columns.append(column)
+            offset += 8 * self.rows
+        view.release()
+
+    def column(self, name):
+        '''(ColumnarPopulation, str) -> sequence
+        Return the column of input name.'''
+        return self.columns[self.names.index(name)]
+
+    def category_columns(self):
+        '''(ColumnarPopulation) -> list of list of sequence
+        Return the columns of every category, the shape taken by
+        calculate_footprint_batch.'''
+        return [[self.column(name) for name in inputs] for category, inputs in self.categories]
+
+    def score(self):
+        '''(ColumnarPopulation) -> list of sequence
+        Return one result column per category for the whole population.'''
+        return calculate_footprint_batch(self.category_columns())
+
+    def close(self):
+        '''(ColumnarPopulation) -> NoneType
+        Drop the columns and unmap the file. A column the caller still
+        holds (a numpy array or a memoryview alike) keeps the map alive,
+        and readable, until it is dropped too.'''
+        self.columns = []
+        try:
+            self.map.close()
+        except BufferError: # a caller still holds a column, the map goes with it
+            pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
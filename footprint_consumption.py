@@ -2,18 +2,18 @@
 # Footprint of computing and diet
 # Author: Yian Bian 260886212
 
-import doctest
 from unit_conversion import *
+import footprint_factors as factors
 
 ######################################
-days_in_year = 365.2425
-pound_in_kg = 0.45359237
-kg_in_ton = 0.001
-kwh_in_mwh = 0.001
-km_in_miles = 0.621371
-g_in_ton = 0.000001
-
-def fp_of_computing(daily_online_use, daily_phone_use, new_light_devices, new_medium_devices, new_heavy_devices):
+days_in_year = UNITS.factor('year', 'day')
+pound_in_kg = UNITS.factor('lb', 'kg')
+kg_in_ton = UNITS.factor('kg', 't')
+kwh_in_mwh = UNITS.factor('kWh', 'MWh')
+km_in_miles = UNITS.factor('km', 'mile')
+g_in_ton = UNITS.factor('g', 't')
+
+def fp_of_computing(daily_online_use, daily_phone_use, new_light_devices, new_medium_devices, new_heavy_devices, *, table=None):
     '''(num, num) -> float
 
     Metric tonnes of CO2E from computing, based on daily hours of online & phone use, and how many small (phone/tablet/etc) & large (laptop) & workstation devices you bought.
@@ -45,16 +45,17 @@ def fp_of_computing(daily_online_use, daily_phone_use, new_light_devices, new_me
     >>> round(fp_of_computing(4, 2, 2, 1, 1), 4)
     3.7304
     '''
-    daily_online_g = daily_online_use * 55 #use the daily hours online to multiply the CO2E produced by online use per hour to get the daily CO2E produced by online use(in gram)
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
+    daily_online_g = daily_online_use * table['online_g_per_hour'] #use the daily hours online to multiply the CO2E produced by online use per hour to get the daily CO2E produced by online use(in gram)
     daily_online_ton = daily_online_g * g_in_ton#convert g to ton
     annual_online_ton = daily_online_ton * days_in_year # use the daily footprint to multiply the number of days in a year to get the annual footprint
-    annual_phone_kg = daily_phone_use * 1250 #use the daily hours of phone use to multiply the CO2E produced for a year of using phone one hour a day to get the anuual CO2E(in kilograms)
+    annual_phone_kg = daily_phone_use * table['phone_kg_per_daily_hour'] #use the daily hours of phone use to multiply the CO2E produced for a year of using phone one hour a day to get the anuual CO2E(in kilograms)
     annual_phone_ton = annual_phone_kg * kg_in_ton #conver kg to tonnes
-    new_light_kg = new_light_devices * 75 #use the number of new light devices to multiply the CO2E that produced by one new light devices to the total CO2E produced by new light devices
+    new_light_kg = new_light_devices * table['light_device_kg'] #use the number of new light devices to multiply the CO2E that produced by one new light devices to the total CO2E produced by new light devices
     new_light_ton = new_light_kg * kg_in_ton # convert kg to tonnes
-    new_medium_kg = new_medium_devices * 200 #use the number of new medium devices to multiply the CO2E that produced by one new medium devices to the total CO2E produced by new medium devices
+    new_medium_kg = new_medium_devices * table['medium_device_kg'] #use the number of new medium devices to multiply the CO2E that produced by one new medium devices to the total CO2E produced by new medium devices
     new_medium_ton = new_medium_kg * kg_in_ton # convert kg to tonnes
-    new_heavy_kg = new_heavy_devices * 800 #use the number of new heavy devices to multiply the CO2E that produced by one new heavy devices to the total CO2E produced by new heavy devices
+    new_heavy_kg = new_heavy_devices * table['heavy_device_kg'] #use the number of new heavy devices to multiply the CO2E that produced by one new heavy devices to the total CO2E produced by new heavy devices
     new_heavy_ton = new_heavy_kg * kg_in_ton # convert kg to tonnes
     fp_of_computing = annual_online_ton + annual_phone_ton + new_light_ton + new_medium_ton + new_heavy_ton # sum up to get the total tonnes of CO2E from computing
     return fp_of_computing
@@ -62,7 +63,7 @@ def fp_of_computing(daily_online_use, daily_phone_use, new_light_devices, new_me
 
 ######################################
 
-def fp_of_diet(daily_g_meat, daily_g_cheese, daily_L_milk, daily_num_eggs):
+def fp_of_diet(daily_g_meat, daily_g_cheese, daily_L_milk, daily_num_eggs, *, table=None):
     '''
     (num, num, num, num) -> flt
     Approximate annual CO2E footprint in metric tonnes, from diet, based on daily consumption of meat in grams, cheese in grams, milk in litres, and eggs.
@@ -100,11 +101,12 @@ def fp_of_diet(daily_g_meat, daily_g_cheese, daily_L_milk, daily_num_eggs):
     >>> round(fp_of_diet(126, 293.52, 1, 1), 4)
     3.7827
     '''
-    vegan_diet = 2.89 * 1000 #convert kg to g
-    daily_meat = daily_g_meat * 26.8 # use the grams of meat multiply the CO2E produced by having 1 gram of meat to get the total
-    daily_cheese = daily_g_cheese * 12 # use the grams of cheese multiply the CO2E produced by having 1 gram of cheese to get the total
-    daily_milk = daily_L_milk * 267.7777# use the litres of milk multiply the CO2E produced by having 1 litre of milk to get the total
-    daily_eggs = daily_num_eggs * 300 # use the number of eggs multiply the CO2E produced by having an egg to get the total
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
+    vegan_diet = table['vegan_kg_per_day'] * 1000 #convert kg to g
+    daily_meat = daily_g_meat * table['meat_g_per_g'] # use the grams of meat multiply the CO2E produced by having 1 gram of meat to get the total
+    daily_cheese = daily_g_cheese * table['cheese_g_per_g'] # use the grams of cheese multiply the CO2E produced by having 1 gram of cheese to get the total
+    daily_milk = daily_L_milk * table['milk_g_per_l'] # use the litres of milk multiply the CO2E produced by having 1 litre of milk to get the total
+    daily_eggs = daily_num_eggs * table['egg_g'] # use the number of eggs multiply the CO2E produced by having an egg to get the total
     daily_diet = vegan_diet + daily_meat + daily_cheese + daily_milk + daily_eggs # sum up to get the daily CO2E produced by the diet
     annual_diet = daily_diet * days_in_year # use the number of days in a year multiply the daily CO2E to get the annual CO2E produced by diet
     fp_of_diet = annual_diet * g_in_ton #convert g to tonnes
@@ -114,5 +116,6 @@ def fp_of_diet(daily_g_meat, daily_g_cheese, daily_L_milk, daily_num_eggs):
 #################################################
 
 if __name__ == '__main__':
+    import doctest
     doctest.testmod()
 
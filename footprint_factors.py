@@ -0,0 +1,163 @@
+# Part 20
+# Versioned tables of emission factors
+# Author: Yian Bian 260886212
+
+from types import MappingProxyType
+
+# The factors of the original sources, in the units the fp_of_* functions
+# use them in (see the docstrings of those functions for the sources).
+DEFAULT_FACTORS = {
+    'hydro_kg_per_mwh': 0.6,
+    'gas_lb_per_dollar': 105,
+    'student_t_per_fte': 1.12,
+    'online_g_per_hour': 55,
+    'phone_kg_per_daily_hour': 1250,
+    'light_device_kg': 75,
+    'medium_device_kg': 200,
+    'heavy_device_kg': 800,
+    'vegan_kg_per_day': 2.89,
+    'meat_g_per_g': 26.8,
+    'cheese_g_per_g': 12,
+    'milk_g_per_l': 267.7777,
+    'egg_g': 300,
+    'transit_trip_km': 7.7,
+    'bus_g_per_mile': 150,
+    'rail_g_per_mile': 160,
+    'ride_hailing_t': 100000,
+    'ride_hailing_trips': 81000000,
+    'driving_lb_per_mile': 0.79,
+    'long_flight_lb': 4400,
+    'short_flight_lb': 1100,
+    'train_kg': 34.45,
+    'coach_kg': 33,
+    'hotel_g_per_dollar': 270,
+}
+
+
+#################################################
+
+class FactorTable:
+    '''A complete, immutable set of emission factors with a version. The
+    factors not given in values are taken from base (DEFAULT by default),
+    so a new version only needs to list what changed.
+
+    >>> table = FactorTable('2', {'hydro_kg_per_mwh': 1.2})
+    >>> table['hydro_kg_per_mwh'], table['egg_g'], table.changed(DEFAULT)
+    (1.2, 300, ['hydro_kg_per_mwh'])
+    >>> FactorTable('3', {'hydro': 1})
+    Traceback (most recent call last):
+    ValueError: unknown emission factor hydro
+    >>> import pickle
+    >>> pickle.loads(pickle.dumps(table))['hydro_kg_per_mwh']
+    1.2
+    '''
+
+    def __init__(self, version, values=None, base=None):
+        self.version = str(version)
+        factors = dict(DEFAULT_FACTORS if base is None else base.factors)
+        for name, value in (values or {}).items():
+            if name not in DEFAULT_FACTORS:
+                raise ValueError('unknown emission factor ' + name)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError('emission factor ' + name + ' is not a number')
+            factors[name] = value
+        self.factors = MappingProxyType(factors) # read only, like the table
+
+    def __getitem__(self, name):
+        return self.factors[name]
+
+    def changed(self, other):
+        '''(FactorTable, FactorTable) -> list of str
+        Return the names of the factors that differ from other.'''
+        return [name for name in DEFAULT_FACTORS if self.factors[name] != other.factors[name]]
+
+    def to_dict(self):
+        '''(FactorTable) -> dict
+        Return the table in the layout read by load_factors.'''
+        return {'version': self.version, 'factors': dict(self.factors)}
+
+    def __reduce__(self):
+        '''(FactorTable) -> tuple
+        Pickle the table as its version and values, e.g. to send it to a
+        worker process (a read-only mapping cannot be pickled itself).'''
+        return FactorTable, (self.version, dict(self.factors))
+
+    def __repr__(self):
+        return 'FactorTable(' + repr(self.version) + ')'
+
+
+DEFAULT = FactorTable('1')
+
+# the table every fp_of_* function reads its factors from unless it is given
+# one as its table keyword; replace it with footprint_model.use_factors so
+# the compiled model follows
+ACTIVE = DEFAULT
+
+
+def factor(name):
+    '''(str) -> num
+    Return the emission factor name of the ACTIVE table.
+
+    >>> factor('hydro_kg_per_mwh')
+    0.6
+    '''
+    return ACTIVE[name]
+
+
+def load_factors(fname, base=None):
+    '''(str, FactorTable) -> FactorTable
+    Return the table in the JSON file with name fname, an object with a
+    "version" and the "factors" that differ from base (DEFAULT by default).
+    '''
+    import json # only needed when tables are read, keep it off the import path
+    with open(fname, 'r') as f:
+        data = json.load(f)
+    if 'version' not in data:
+        raise ValueError(fname + ' has no version')
+    return FactorTable(data['version'], data.get('factors', {}), base)
+
+
+def save_factors(table, fname):
+    '''(FactorTable, str) -> NoneType
+    Write table to a JSON file with name fname.'''
+    import json
+    with open(fname, 'w') as f:
+        json.dump(table.to_dict(), f, indent=1, sort_keys=True)
+
+
+class using:
+    '''Context manager that swaps table in with footprint_model.use_factors
+    for the duration of the block, in this thread and every other: the
+    fp_of_* functions and the compiled MODEL (with the batch scoring, the
+    server, the scenarios and the jobs built on it) all follow it, e.g. for
+    a script trying a table out. To score under a table without touching
+    the factors other threads see, pass it as the table keyword of the
+    fp_of_* functions or compile a FootprintModel with it instead.
+
+    >>> import footprint_model
+    >>> with using(FactorTable('2', {'egg_g': 0})):
+    ...     factor('egg_g'), footprint_model.MODEL.factor_version
+    (0, '2')
+    >>> factor('egg_g'), footprint_model.MODEL.factor_version
+    (300, '1')
+    '''
+
+    def __init__(self, table):
+        self.table = table
+
+    def __enter__(self):
+        from footprint_model import use_factors # footprint_model imports this module
+        self.previous = ACTIVE
+        use_factors(self.table)
+        return self.table
+
+    def __exit__(self, *exc):
+        from footprint_model import use_factors
+        use_factors(self.previous)
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
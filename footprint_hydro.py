@@ -0,0 +1,337 @@
+# Part 21
+# Utilities footprint from hourly meter readings and grid intensity
+# Author: Yian Bian 260886212
+
+import csv
+import datetime
+import mmap
+import struct
+from array import array
+from bisect import bisect_right
+
+from unit_conversion import UNITS
+import footprint_factors as factors
+from footprint_services import fp_from_gas
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, fall back to plain lists
+    np = None
+
+HOURS_IN_YEAR = UNITS.factor('year', 'hour')
+KWH_IN_MWH = UNITS.factor('kWh', 'MWh')
+KG_IN_TONNE = UNITS.factor('kg', 't')
+
+# Binary meter files are a sequence of fixed-size records: the household
+# id as a little-endian int64, the Unix time (seconds) of the start of the
+# hour as an int64 and the kWh used in that hour as a float64.
+RECORD = struct.Struct('<qqd')
+CHUNK_RECORDS = 1 << 20
+
+
+#################################################
+
+def parse_time(text):
+    '''(str) -> int
+    Return the Unix time (seconds) of text, either a number of seconds or
+    an ISO 8601 date and time, taken as UTC when it has no offset.
+
+    >>> parse_time('3600'), parse_time('1970-01-01T02:00')
+    (3600, 7200)
+    '''
+    text = text.strip()
+    if text.lstrip('-').isdigit():
+        return int(text)
+    when = datetime.datetime.fromisoformat(text)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return int(when.timestamp())
+
+
+class IntensityCurve:
+    '''Grid intensity (kg CO2E / MWh) as a step function of time: each
+    value holds from its time until the next one. Times are kept sorted in
+    an array, so looking one up is a binary search, and looking up a whole
+    column of times at once is a single numpy searchsorted. Times before
+    the curve starts get the flat hydro factor of the emission factors in
+    use.
+
+    >>> curve = IntensityCurve([0, 3600, 7200], [0.5, 0.8, 0.6])
+    >>> curve.at(-1), curve.at(0), curve.at(5000), curve.at(10 ** 9)
+    (0.6, 0.5, 0.8, 0.6)
+    >>> list(map(float, curve.lookup([3599, 3600])))
+    [0.5, 0.8]
+    '''
+
+    def __init__(self, times, values):
+        pairs = sorted(zip(times, values))
+        self.times = array('q', [t for t, v in pairs])
+        self.values = array('d', [v for t, v in pairs])
+        if np is not None and len(pairs):
+            self.np_times = np.frombuffer(self.times, dtype=np.int64)
+            self.np_values = np.frombuffer(self.values, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.times)
+
+    def at(self, t):
+        '''(IntensityCurve, int) -> float
+        Return the intensity at Unix time t.'''
+        i = bisect_right(self.times, t) - 1
+        if i < 0:
+            return factors.factor('hydro_kg_per_mwh')
+        return self.values[i]
+
+    def lookup(self, times):
+        '''(IntensityCurve, seq of int) -> seq of float
+        Return the intensity at every Unix time in times.'''
+        default = factors.factor('hydro_kg_per_mwh')
+        if not len(self.times):
+            return [default] * len(times)
+        if np is not None:
+            i = np.searchsorted(self.np_times, np.asarray(times, dtype=np.int64), side='right') - 1
+            return np.where(i >= 0, self.np_values[np.maximum(i, 0)], default)
+        curve_times, values = self.times, self.values
+        result = []
+        for t in times:
+            i = bisect_right(curve_times, t) - 1
+            result.append(values[i] if i >= 0 else default)
+        return result
+
+
+def load_intensity(fname):
+    '''(str) -> IntensityCurve
+    Return the curve in the CSV file with name fname, one row per hour
+    with its time (see parse_time) and intensity in kg CO2E / MWh. A
+    header row is skipped.'''
+    times, values = [], []
+    with open(fname, 'r', newline='') as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            try:
+                value = float(row[1])
+            except ValueError:
+                if times: # only the first row may be a header
+                    raise
+                continue
+            times.append(parse_time(row[0]))
+            values.append(value)
+    return IntensityCurve(times, values)
+
+
+#################################################
+
+class HydroTotals:
+    '''The emissions, kWh and hours of meter readings of every household,
+    added one reading or one column of readings at a time. Totals of
+    separate shards of readings merge into the totals of all of them.
+
+    >>> curve = IntensityCurve([0, 3600], [0.5, 1.0])
+    >>> totals = HydroTotals()
+    >>> totals.add_many(['a', 'a', 'b'], [0, 3600, 0], [2.0, 2.0, 1.0], curve)
+    >>> totals.emissions['a'], totals.kwh['a'], totals.hours['a']
+    (0.003, 4.0, 2)
+    >>> round(totals.annual('a') * 1000, 4) # kg per year, at 3 g every 2 hours
+    13.1487
+    '''
+
+    def __init__(self):
+        self.emissions = {} # kg CO2E
+        self.kwh = {}
+        self.hours = {}
+
+    def _add_totals(self, household, emissions, kwh, hours):
+        '''(HydroTotals, object, float, float, float) -> NoneType
+        Add emissions (kg CO2E), kwh and hours to the totals of household.'''
+        if household in self.hours:
+            self.emissions[household] += emissions
+            self.kwh[household] += kwh
+            self.hours[household] += hours
+        else:
+            self.emissions[household] = emissions
+            self.kwh[household] = kwh
+            self.hours[household] = hours
+
+    def add(self, household, t, kwh, curve):
+        '''(HydroTotals, object, int, float, IntensityCurve) -> NoneType
+        Add the reading of kwh used by household in the hour starting at
+        Unix time t.'''
+        self._add_totals(household, kwh * KWH_IN_MWH * curve.at(t), kwh, 1)
+
+    def add_many(self, households, times, kwhs, curve):
+        '''(seq, seq of int, seq of float, IntensityCurve) -> NoneType
+        Add a column of readings: one household, hour and kWh per row.
+        The intensities are looked up in one pass and the readings grouped
+        by household before they reach the totals.'''
+        intensity = curve.lookup(times)
+        if np is not None:
+            kwhs = np.asarray(kwhs, dtype=np.float64)
+            emissions = kwhs * KWH_IN_MWH * intensity
+            keys, groups = np.unique(np.asarray(households), return_inverse=True)
+            group_emissions = np.bincount(groups, weights=emissions, minlength=len(keys))
+            group_kwh = np.bincount(groups, weights=kwhs, minlength=len(keys))
+            group_hours = np.bincount(groups, minlength=len(keys))
+            for key, e, k, h in zip(keys.tolist(), group_emissions.tolist(),
+                                    group_kwh.tolist(), group_hours.tolist()):
+                self._add_totals(key, e, k, h)
+            return
+        grouped = {}
+        for household, kwh, g in zip(households, kwhs, intensity):
+            total = grouped.get(household)
+            if total is None:
+                total = grouped[household] = [0.0, 0.0, 0]
+            total[0] += kwh * KWH_IN_MWH * g
+            total[1] += kwh
+            total[2] += 1
+        for household, (e, k, h) in grouped.items():
+            self._add_totals(household, e, k, h)
+
+    def merge(self, other):
+        '''(HydroTotals, HydroTotals) -> HydroTotals
+        Add the totals of other to these and return self.'''
+        for household in other.hours:
+            self._add_totals(household, other.emissions[household], other.kwh[household], other.hours[household])
+        return self
+
+    def annual(self, household):
+        '''(HydroTotals, object) -> float
+        Return the annual footprint of household in tonnes of CO2E, from
+        the average emissions per hour of its readings.'''
+        return self.emissions[household] * KG_IN_TONNE / self.hours[household] * HOURS_IN_YEAR
+
+    def annual_utilities(self, household, monthly_gas=0):
+        '''(HydroTotals, object, num) -> float
+        Return the annual utilities footprint of household in tonnes of
+        CO2E: its metered hydro plus the gas of a monthly bill in $, as in
+        fp_of_utilities.'''
+        return self.annual(household) + fp_from_gas(monthly_gas)
+
+    def annual_all(self):
+        '''(HydroTotals) -> dict
+        Return the annual footprint of every household.'''
+        return {household: self.annual(household) for household in self.hours}
+
+
+#################################################
+
+def read_meter_csv(f, chunk_records=CHUNK_RECORDS):
+    '''(file, int) -> iterator of (list, array, array)
+    Yield the readings in the open CSV file f (household, time, kWh, with
+    an optional header row) as columns of at most chunk_records rows.
+
+    >>> import io
+    >>> data = io.StringIO('household,time,kwh\\nh1,0,1.5\\nh2,3600,0.5\\nh1,3600,2\\n')
+    >>> [(h, list(t), list(k)) for h, t, k in read_meter_csv(data, 2)]
+    [(['h1', 'h2'], [0, 3600], [1.5, 0.5]), (['h1'], [3600], [2.0])]
+    '''
+    households, times, kwhs = [], array('q'), array('d')
+    for n, row in enumerate(csv.reader(f)):
+        if not row:
+            continue
+        try:
+            kwh = float(row[2])
+        except ValueError:
+            if n == 0:
+                continue
+            raise
+        households.append(row[0])
+        times.append(parse_time(row[1]))
+        kwhs.append(kwh)
+        if len(kwhs) >= chunk_records:
+            yield households, times, kwhs
+            households, times, kwhs = [], array('q'), array('d')
+    if kwhs:
+        yield households, times, kwhs
+
+
+def write_meter_binary(readings, fname):
+    '''(iterable of (int, int, float), str) -> int
+    Write every (household id, Unix time, kWh) in readings to a binary
+    meter file named fname. Return the number of readings written.'''
+    count = 0
+    with open(fname, 'wb') as out:
+        buf = bytearray()
+        for reading in readings:
+            buf += RECORD.pack(*reading)
+            count += 1
+            if len(buf) >= RECORD.size * CHUNK_RECORDS:
+                out.write(buf)
+                buf = bytearray()
+        out.write(buf)
+    return count
+
+
+def read_meter_binary(fname, chunk_records=CHUNK_RECORDS):
+    '''(str, int) -> iterator of (seq, seq, seq)
+    Yield the readings of the binary meter file named fname as columns of
+    at most chunk_records rows, read straight from a memory map: numpy
+    views when numpy is available, otherwise arrays.
+
+    >>> import os, tempfile
+    >>> fname = os.path.join(tempfile.mkdtemp(), 'meter.bin')
+    >>> write_meter_binary([(1, 0, 1.5), (2, 3600, 0.5), (1, 3600, 2.0)], fname)
+    3
+    >>> [(list(map(int, h)), list(map(int, t)), list(map(float, k))) for h, t, k in read_meter_binary(fname, 2)]
+    [([1, 2], [0, 3600], [1.5, 0.5]), ([1], [3600], [2.0])]
+    '''
+    with open(fname, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # an empty file cannot be mapped
+            return
+        records = chunk = view = None
+        try:
+            if len(data) % RECORD.size:
+                raise ValueError(fname + ' is not a binary meter file')
+            rows = len(data) // RECORD.size
+            if np is not None:
+                dtype = np.dtype([('household', '<i8'), ('time', '<i8'), ('kwh', '<f8')])
+                records = np.frombuffer(data, dtype=dtype)
+                for start in range(0, rows, chunk_records):
+                    chunk = records[start:start + chunk_records]
+                    yield chunk['household'], chunk['time'], chunk['kwh']
+                return
+            for start in range(0, rows, chunk_records):
+                households, times, kwhs = array('q'), array('q'), array('d')
+                end = min(rows, start + chunk_records)
+                with memoryview(data) as view:
+                    for household, t, kwh in RECORD.iter_unpack(view[start * RECORD.size:end * RECORD.size]):
+                        households.append(household)
+                        times.append(t)
+                        kwhs.append(kwh)
+                yield households, times, kwhs
+        finally:
+            records = chunk = view = None
+            try:
+                data.close()
+            except BufferError: # a caller still holds a chunk, the map goes with it
+                pass
+
+
+def aggregate_meter_readings(chunks, curve, totals=None):
+    '''(iterable of (seq, seq, seq), IntensityCurve, HydroTotals) -> HydroTotals
+    Add every chunk of readings (from read_meter_csv or read_meter_binary)
+    to totals (new ones by default) and return them.'''
+    if totals is None:
+        totals = HydroTotals()
+    for households, times, kwhs in chunks:
+        totals.add_many(households, times, kwhs, curve)
+    return totals
+
+
+def aggregate_meter_file(fname, curve, totals=None):
+    '''(str, IntensityCurve, HydroTotals) -> HydroTotals
+    Same as aggregate_meter_readings, for the meter file with name fname:
+    binary if it ends with .bin, otherwise CSV.'''
+    if fname.endswith('.bin'):
+        return aggregate_meter_readings(read_meter_binary(fname), curve, totals)
+    with open(fname, 'r', newline='') as f:
+        return aggregate_meter_readings(read_meter_csv(f), curve, totals)
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,82 @@
+# Part 10
+# Incremental recomputation of a changing input file
+# Author: Yian Bian 260886212
+
+import footprint_factors as factors
+from footprint_calculator import read_sections_from_stream, calculate_section
+from footprint_model import CATEGORY_NAMES
+
+
+#################################################
+
+class IncrementalFootprint:
+    '''Remember the arguments and result of every section of the last
+    input scored, so that scoring an edited version of it only calls the
+    functions of the sections whose arguments changed. A change of the
+    emission factors in use makes every section dirty.
+
+    >>> inc = IncrementalFootprint()
+    >>> sections = [[48.8, 20], [30], [4, 2, 2, 1, 1], [25, 0, 1, 1], [2, 2, 1, 10], [1, 2, 3, 4, 5]]
+    >>> results, dirty = inc.update(sections)
+    >>> dirty
+    ['Utilities', 'University', 'Computing', 'Diet', 'Transportation', 'Travel']
+    >>> sections[3] = [0, 0, 1, 1] # went vegetarian
+    >>> results, dirty = inc.update(sections)
+    >>> dirty
+    ['Diet']
+    >>> [round(r, 4) for r in results]
+    [0.9632, 1.12, 3.7304, 1.2629, 0.3354, 3.2304]
+    '''
+
+    def __init__(self):
+        self.sections = [None] * len(CATEGORY_NAMES)
+        self.results = [''] * len(CATEGORY_NAMES)
+        self.version = factors.ACTIVE.version
+
+    def update(self, sections):
+        '''(IncrementalFootprint, list of lst) -> (lst, list of str)
+        Score the arguments of the six sections, reusing the previous
+        result of every section whose arguments did not change. Return the
+        results and the names of the sections that were recomputed.
+        '''
+        if self.version != factors.ACTIVE.version:
+            self.__init__()
+        dirty = []
+        for i, args in enumerate(sections):
+            args = list(args)
+            if args != self.sections[i]:
+                self.results[i] = calculate_section(i, args)
+                self.sections[i] = args
+                dirty.append(CATEGORY_NAMES[i])
+        return list(self.results), dirty
+
+    def update_from_stream(self, f):
+        '''(IncrementalFootprint, file) -> (lst, list of str)
+        Same as update, with the sections of the first person in the open
+        file f.'''
+        for header, sections in read_sections_from_stream(f):
+            return self.update(sections)
+        return self.update([[] for name in CATEGORY_NAMES])
+
+    def update_from_input(self, fname):
+        '''(IncrementalFootprint, str) -> (lst, list of str)
+        Same as update, with the sections of the file with name fname.'''
+        with open(fname, 'r') as f:
+            return self.update_from_stream(f)
+
+
+def calculate_footprint_incremental(fname, state):
+    '''(str, IncrementalFootprint) -> (lst, list of str)
+    Incremental calculate_footprint_from_input: read input from file with
+    name fname and only call the functions of the sections that changed
+    since state last scored a file. Return the results and the names of
+    the sections that were dirty.
+    '''
+    return state.update_from_input(fname)
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,226 @@
+# Part 25
+# Top emitters and percentile ranks of a scored population
+# Author: Yian Bian 260886212
+
+import math
+from bisect import bisect_left, insort
+
+from footprint_aggregate import COLUMNS
+
+BLOCK_SIZE = 1000
+
+
+#################################################
+
+class SortedIndex:
+    '''A sorted multiset of keys kept as a list of sorted blocks of about
+    BLOCK_SIZE keys, with the largest key of every block and a Fenwick tree
+    of the block sizes. Finding a key's block is a binary search over the
+    block maxima, its position in the block another one, and the number of
+    keys in earlier blocks a Fenwick prefix sum, so adding, removing and
+    ranking all take logarithmic time (plus a short memmove in one block).
+
+    >>> index = SortedIndex(block_size=2)
+    >>> for key in [5, 1, 4, 2, 3, 3]:
+    ...     index.add(key)
+    >>> len(index), index.rank(3), index.rank(3.5), list(index.largest(2))
+    (6, 2, 4, [5, 4])
+    >>> index.remove(3); index.remove(5); list(index.largest(10))
+    [4, 3, 2, 1]
+    '''
+
+    def __init__(self, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self.blocks = []
+        self.maxes = []
+        self.tree = []
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _rebuild(self):
+        '''(SortedIndex) -> NoneType
+        Rebuild the Fenwick tree after blocks were split or dropped.'''
+        tree = [len(block) for block in self.blocks]
+        for i in range(len(tree)):
+            parent = i | (i + 1)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def _grow(self, i, amount):
+        '''(SortedIndex, int, int) -> NoneType
+        Record that block i gained amount keys (lost, if negative).'''
+        tree = self.tree
+        while i < len(tree):
+            tree[i] += amount
+            i |= i + 1
+
+    def _before(self, i):
+        '''(SortedIndex, int) -> int
+        Return the number of keys in the blocks before block i.'''
+        total = 0
+        tree = self.tree
+        while i > 0:
+            total += tree[i - 1]
+            i &= i - 1
+        return total
+
+    def add(self, key):
+        '''(SortedIndex, object) -> NoneType
+        Add key.'''
+        self.size += 1
+        if not self.blocks:
+            self.blocks.append([key])
+            self.maxes.append(key)
+            self._rebuild()
+            return
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            i -= 1
+        block = self.blocks[i]
+        insort(block, key)
+        self.maxes[i] = block[-1]
+        if len(block) > 2 * self.block_size:
+            half = len(block) // 2
+            self.blocks[i:i + 1] = [block[:half], block[half:]]
+            self.maxes[i:i + 1] = [block[half - 1], block[-1]]
+            self._rebuild()
+        else:
+            self._grow(i, 1)
+
+    def remove(self, key):
+        '''(SortedIndex, object) -> NoneType
+        Remove one key equal to key, or raise KeyError.'''
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            raise KeyError(key)
+        block = self.blocks[i]
+        j = bisect_left(block, key)
+        if block[j] != key:
+            raise KeyError(key)
+        del block[j]
+        self.size -= 1
+        if block:
+            self.maxes[i] = block[-1]
+            self._grow(i, -1)
+        else:
+            del self.blocks[i]
+            del self.maxes[i]
+            self._rebuild()
+
+    def rank(self, key):
+        '''(SortedIndex, object) -> int
+        Return the number of keys smaller than key.'''
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return self.size
+        return self._before(i) + bisect_left(self.blocks[i], key)
+
+    def largest(self, k):
+        '''(SortedIndex, int) -> iterator
+        Yield the k largest keys, the largest first.'''
+        for block in reversed(self.blocks):
+            for key in reversed(block):
+                if k <= 0:
+                    return
+                yield key
+                k -= 1
+
+
+#################################################
+
+class FootprintIndex:
+    '''The results of a scored population indexed by every category and
+    the total, for the dashboard: the top emitters of a category and where
+    a footprint stands in it. People are added and rescored one at a time
+    as their results arrive, each in logarithmic time. A person with an
+    empty section is not ranked in that category.
+
+    >>> index = FootprintIndex().add_all([('Alice', [1.0, 1.12, '', 1.5, 0.3, 3.2]), ('Bob', [0.5, 0.67, '', 1.1, 0.0, 0.0]),
+    ...                ('Carol', [2.0, 0.0, '', 2.9, 1.0, 15.4])])
+    >>> index.top('Travel', 2)
+    [('Carol', 15.4), ('Alice', 3.2)]
+    >>> index.percentile_rank('Travel', 3.2), round(index.person_rank('Bob', 'Total'), 2)
+    (50.0, 16.67)
+    >>> index.update('Bob', [0.5, 0.67, '', 1.1, 0.0, 20.0]) # took a long trip
+    >>> index.top('Travel', 1), len(index.indexes['Computing'])
+    ([('Bob', 20.0)], 0)
+    '''
+
+    def __init__(self, columns=COLUMNS, block_size=BLOCK_SIZE):
+        self.columns = list(columns)
+        self.indexes = {name: SortedIndex(block_size) for name in self.columns}
+        self.ids = {}
+        self.names = []
+        self.values = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def _keys(self, person_id, results):
+        '''Return (column, key) of every indexed value of results and
+        their total.'''
+        numbers = [r for r in results if r != '']
+        values = list(results) + [math.fsum(numbers)]
+        return [(name, (value, person_id)) for name, value in zip(self.columns, values) if value != '']
+
+    def update(self, person, results):
+        '''(FootprintIndex, str, lst) -> NoneType
+        Index the results of person ('' for empty sections), replacing
+        the ones indexed before.'''
+        if person in self.values:
+            self.remove(person)
+        person_id = self.ids.get(person)
+        if person_id is None:
+            person_id = self.ids[person] = len(self.names)
+            self.names.append(person)
+        keys = self._keys(person_id, results)
+        for name, key in keys:
+            self.indexes[name].add(key)
+        self.values[person] = dict((name, key[0]) for name, key in keys)
+
+    add = update
+
+    def add_all(self, records):
+        '''(FootprintIndex, iterable of (str, lst)) -> FootprintIndex
+        Index every (header, results) in records and return self.'''
+        for header, results in records:
+            self.update(header, results)
+        return self
+
+    def remove(self, person):
+        '''(FootprintIndex, str) -> NoneType
+        Stop indexing person.'''
+        person_id = self.ids[person]
+        for name, value in self.values.pop(person).items():
+            self.indexes[name].remove((value, person_id))
+
+    def top(self, column, k=10):
+        '''(FootprintIndex, str, int) -> list of (str, float)
+        Return the k largest footprints of column, with their person.'''
+        return [(self.names[person_id], value) for value, person_id in self.indexes[column].largest(k)]
+
+    def percentile_rank(self, column, value):
+        '''(FootprintIndex, str, float) -> float
+        Return the percentage of the people ranked in column whose
+        footprint is below value, counting half of those equal to it.'''
+        index = self.indexes[column]
+        if not len(index):
+            return 0.0
+        below = index.rank((value, -1))
+        equal = index.rank((value, math.inf)) - below
+        return 100 * (below + equal / 2) / len(index)
+
+    def person_rank(self, person, column):
+        '''(FootprintIndex, str, str) -> float
+        Return the percentile rank of person's own footprint in column.'''
+        return self.percentile_rank(column, self.values[person][column])
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
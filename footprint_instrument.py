@@ -0,0 +1,171 @@
+# Part 13
+# Opt-in timing of the stages of a run
+# Author: Yian Bian 260886212
+
+import time
+
+# Instrumentation is off unless enable() is called. Every instrumented call
+# site checks ENABLED first, so a disabled run only pays for that check.
+ENABLED = False
+HOOK = None
+
+
+#################################################
+
+class Stats:
+    '''Wall time, number of calls, rows and bytes processed by every stage
+    of a run. Stages nest: 'parse' includes the time of 'read', which is
+    the time spent reading lines from the input.
+
+    >>> s = Stats()
+    >>> s.add('parse', 0.5, rows=10, nbytes=200); s.add('parse', 0.25, rows=5)
+    >>> s.as_dict()
+    {'parse': {'calls': 2, 'seconds': 0.75, 'rows': 15, 'bytes': 200}}
+    '''
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, seconds, calls=1, rows=0, nbytes=0):
+        '''(Stats, str, float, int, int, int) -> NoneType
+        Add one measurement of stage name.'''
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = [0, 0.0, 0, 0]
+        stage[0] += calls
+        stage[1] += seconds
+        stage[2] += rows
+        stage[3] += nbytes
+
+    def as_dict(self):
+        '''(Stats) -> dict
+        Return the totals of every stage.'''
+        return {name: {'calls': c, 'seconds': s, 'rows': r, 'bytes': b}
+                for name, (c, s, r, b) in self.stages.items()}
+
+    def reset(self):
+        '''(Stats) -> NoneType
+        Forget every measurement.'''
+        self.stages = {}
+
+    def __str__(self):
+        '''(Stats) -> str
+        Return a table of the stages, the slowest first.
+
+        >>> s = Stats()
+        >>> s.add('fp_of_transportation_batch', 0.5, rows=10)
+        >>> [line.split('\\t') for line in str(s).splitlines()]
+        [['Stage                       calls', 'seconds', 'rows', 'bytes'], ['fp_of_transportation_batch  1', '0.5', '10', '0']]
+        '''
+        width = max([24] + [len(name) + 2 for name in self.stages])
+        lines = ['Stage'.ljust(width) + 'calls\tseconds\trows\tbytes']
+        for name, (c, s, r, b) in sorted(self.stages.items(), key=lambda item: -item[1][1]):
+            lines.append(name.ljust(width) + '\t'.join([str(c), str(round(s, 4)), str(r), str(b)]))
+        return '\n'.join(lines)
+
+
+STATS = Stats()
+
+
+def enable(hook=None):
+    '''(function) -> NoneType
+    Start recording into STATS. If hook is given, it is also called as
+    hook(name, seconds, calls, rows, nbytes) for every measurement, e.g. to
+    forward them to a metrics system.'''
+    global ENABLED, HOOK
+    HOOK = hook
+    ENABLED = True
+
+
+def disable():
+    '''() -> NoneType
+    Stop recording. STATS keeps what was recorded so far.'''
+    global ENABLED, HOOK
+    ENABLED = False
+    HOOK = None
+
+
+def record(name, seconds, calls=1, rows=0, nbytes=0):
+    '''(str, float, int, int, int) -> NoneType
+    Record one measurement of stage name in STATS and pass it to the hook.
+
+    >>> seen = []
+    >>> enable(lambda *m: seen.append(m)); record('output', 0.1, rows=6); disable()
+    >>> seen
+    [('output', 0.1, 1, 6, 0)]
+    >>> STATS.reset()
+    '''
+    STATS.add(name, seconds, calls, rows, nbytes)
+    if HOOK is not None:
+        HOOK(name, seconds, calls, rows, nbytes)
+
+
+class stage:
+    '''Context manager recording the wall time of its block as one call of
+    stage name.
+
+    >>> enable()
+    >>> with stage('math', rows=3):
+    ...     x = sum(range(10))
+    >>> disable(); STATS.as_dict()['math']['rows']
+    3
+    >>> STATS.reset()
+    '''
+
+    def __init__(self, name, rows=0, nbytes=0):
+        self.name = name
+        self.rows = rows
+        self.nbytes = nbytes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start, 1, self.rows, self.nbytes)
+
+
+def timed_iter(name, iterable, count_bytes=False):
+    '''(str, iterable, bool) -> generator
+    Yield the items of iterable, recording as stage name the time spent
+    producing them and their number once it is exhausted or closed. With
+    count_bytes, the items are lines and their total size in bytes (UTF-8,
+    for lines of text) is recorded too.
+
+    >>> enable(); list(timed_iter('parse', 'abc')); disable()
+    ['a', 'b', 'c']
+    >>> STATS.as_dict()['parse']['rows']
+    3
+    >>> STATS.reset()
+    >>> enable(); _ = list(timed_iter('read', ['caf\u00e9\\n'], count_bytes=True)); disable()
+    >>> STATS.as_dict()['read']['bytes']
+    6
+    >>> STATS.reset()
+    '''
+    clock = time.perf_counter
+    it = iter(iterable)
+    seconds = 0.0
+    rows = 0
+    nbytes = 0
+    try:
+        while True:
+            start = clock()
+            try:
+                item = next(it)
+            except StopIteration:
+                seconds += clock() - start
+                break
+            seconds += clock() - start
+            rows += 1
+            if count_bytes:
+                nbytes += len(item.encode()) if isinstance(item, str) else len(item)
+            yield item
+    finally:
+        record(name, seconds, 1, rows, nbytes)
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
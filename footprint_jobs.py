@@ -0,0 +1,308 @@
+# Part 23
+# Checkpointed, resumable batch jobs over sharded input files
+# Author: Yian Bian 260886212
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from footprint_parallel import input_files
+from footprint_calculator import calculate_footprints_from_input
+from footprint_aggregate import PopulationAggregate
+from footprint_model import MODEL
+from footprint_writers import write_results
+
+SHARD_SIZE = 1000
+MANIFEST = 'job.json'
+RECORDS_FORMAT = 2 # one record per person; shards of older formats are run again
+
+
+#################################################
+
+def write_checkpoint(path, data):
+    '''(str, object) -> NoneType
+    Write data as JSON to path durably: to a temporary file that is flushed
+    to disk and then renamed over path, so a crash leaves either the old
+    file or the complete new one, never a torn one.'''
+    directory = os.path.dirname(path) or '.'
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    if hasattr(os, 'O_DIRECTORY'): # make the rename itself durable
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def read_checkpoint(path):
+    '''(str) -> object
+    Return the JSON data in path, or None if it is missing or unreadable.'''
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def make_shards(n_files, shard_size=SHARD_SIZE):
+    '''(int, int) -> list of [int, int]
+    Return the [start, end) ranges of files of every shard, in order.
+
+    >>> make_shards(5, 2)
+    [[0, 2], [2, 4], [4, 5]]
+    '''
+    return [[start, min(start + shard_size, n_files)] for start in range(0, n_files, shard_size)]
+
+
+def shards_for_worker(shards, worker=0, workers=1):
+    '''(list, int, int) -> list of int
+    Return the shards (by number) that worker of workers runs, so hosts
+    sharing the job directory split a job without talking to each other.
+
+    >>> shards_for_worker(list(range(7)), 1, 3)
+    [1, 4]
+    '''
+    return [i for i in range(len(shards)) if i % workers == worker]
+
+
+#################################################
+
+def plan_job(job_dir, pattern, shard_size=SHARD_SIZE):
+    '''(str, str, int) -> dict
+    Create the job in job_dir scoring every input file named by pattern
+    (see input_files), or return the job already planned there when
+    restarting. The manifest fixes the files, their shards and the emission
+    factors, so every run and every host agrees on what a shard holds.
+    '''
+    path = os.path.join(job_dir, MANIFEST)
+    job = read_checkpoint(path)
+    files = input_files(pattern)
+    if job is not None:
+        if job['files'] != files:
+            raise ValueError(job_dir + ' holds a job over other input files')
+        if job['factor_version'] != MODEL.factor_version:
+            raise ValueError(job_dir + ' was scored under emission factors ' + job['factor_version'])
+        return job
+    if not files:
+        raise ValueError('no input files match ' + pattern)
+    os.makedirs(os.path.join(job_dir, 'shards'), exist_ok=True)
+    job = {'files': files, 'shards': make_shards(len(files), shard_size),
+           'factor_version': MODEL.factor_version}
+    write_checkpoint(path, job)
+    return job
+
+
+def shard_path(job_dir, shard):
+    '''(str, int) -> str
+    Return the checkpoint file of shard number shard.'''
+    return os.path.join(job_dir, 'shards', '%06d.json' % shard)
+
+
+def load_job(job_dir):
+    '''(str) -> dict
+    Return the manifest of the job in job_dir.'''
+    job = read_checkpoint(os.path.join(job_dir, MANIFEST))
+    if job is None:
+        raise ValueError(job_dir + ' holds no job')
+    return job
+
+
+def finished_shard(job_dir, job, shard):
+    '''(str, dict, int) -> dict
+    Return the checkpoint of shard if it was finished under the job's
+    emission factors and in the current RECORDS_FORMAT, otherwise None.'''
+    checkpoint = read_checkpoint(shard_path(job_dir, shard))
+    if (checkpoint is None or checkpoint.get('factor_version') != job['factor_version']
+            or checkpoint.get('format') != RECORDS_FORMAT):
+        return None
+    return checkpoint
+
+
+def pending_shards(job_dir, worker=0, workers=1):
+    '''(str, int, int) -> list of int
+    Return the shards of worker that have no checkpoint yet.'''
+    job = load_job(job_dir)
+    return [i for i in shards_for_worker(job['shards'], worker, workers)
+            if finished_shard(job_dir, job, i) is None]
+
+
+def score_people(fname):
+    '''(str) -> list of (str, str, lst, str)
+    Return a record (fname, header, results, error) for every person in
+    the input file with name fname, in file order. A failure does not
+    raise: it ends the file with a record whose results are None and
+    whose error describes what went wrong.
+
+    >>> score_people('no_such_file.csv')[0][1:]
+    ('', None, "FileNotFoundError: [Errno 2] No such file or directory: 'no_such_file.csv'")
+    '''
+    records = []
+    try:
+        for header, results in calculate_footprints_from_input(fname):
+            records.append((fname, header, results, None))
+    except Exception as e:
+        records.append((fname, '', None, type(e).__name__ + ': ' + str(e)))
+    return records
+
+
+def run_shard(job_dir, shard):
+    '''(str, int) -> int
+    Score every person of every file of shard and write its checkpoint:
+    the records of score_people in file order and their
+    PopulationAggregate. Running a shard twice writes the same
+    checkpoint. Return shard.'''
+    job = load_job(job_dir)
+    start, end = job['shards'][shard]
+    records = [record for fname in job['files'][start:end] for record in score_people(fname)]
+    aggregate = PopulationAggregate()
+    for fname, header, results, error in records:
+        if error is None:
+            aggregate.add(results)
+    write_checkpoint(shard_path(job_dir, shard),
+                     {'shard': shard, 'factor_version': job['factor_version'], 'format': RECORDS_FORMAT,
+                      'records': records, 'aggregate': aggregate.to_dict()})
+    return shard
+
+
+#################################################
+
+class LocalExecutor:
+    '''Run shards one after the other in this process: the stand-in for
+    a pool or for other hosts when testing.'''
+
+    def map(self, fun, shards):
+        '''(LocalExecutor, function, list of int) -> iterator
+        Run fun on every shard, in order.'''
+        return map(fun, shards)
+
+    def close(self):
+        '''(LocalExecutor) -> NoneType
+        Nothing to release.'''
+        pass
+
+
+class ProcessExecutor:
+    '''Run shards over a pool of worker processes (default: one per core).'''
+
+    def __init__(self, processes=None):
+        self.pool = multiprocessing.Pool(processes)
+
+    def map(self, fun, shards):
+        '''(ProcessExecutor, function, list of int) -> iterator
+        Run fun on every shard over the pool, yielding results as they
+        finish.'''
+        return self.pool.imap_unordered(fun, shards)
+
+    def close(self):
+        '''(ProcessExecutor) -> NoneType
+        Wait for the pool to finish and stop its workers.'''
+        self.pool.close()
+        self.pool.join()
+
+
+def run_job(job_dir, executor=None, worker=0, workers=1):
+    '''(str, object, int, int) -> list of int
+    Run the shards of worker of workers that are not finished yet over
+    executor (a LocalExecutor by default) and return them in the order
+    they finished. A shard that crashes leaves no checkpoint and is run
+    again by the next call.'''
+    if executor is None:
+        executor = LocalExecutor()
+    todo = pending_shards(job_dir, worker, workers)
+    return list(executor.map(functools.partial(run_shard, job_dir), todo))
+
+
+def merge_job(job_dir):
+    '''(str) -> (list, PopulationAggregate)
+    Return the records of every person of the finished job in input order,
+    and the aggregate of all of them. Shards are merged in shard order, so
+    the result does not depend on how or where they ran.
+
+    >>> job_dir, data_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    >>> person = lambda name, credits: name + '\\n--------\\n--------\\n,' + str(credits) + '\\n' + '--------\\n' * 5
+    >>> for name, people in [('a', person('Alice', 30) + person('Ann', 15)), ('b', person('Bob', 18)), ('c', person('Carol', 0))]:
+    ...     with open(os.path.join(data_dir, name + '.csv'), 'w') as f:
+    ...         _ = f.write(people)
+    >>> job = plan_job(job_dir, data_dir, shard_size=2)
+    >>> run_job(job_dir, worker=1, workers=2), pending_shards(job_dir)
+    ([1], [0])
+    >>> run_job(job_dir), run_job(job_dir)
+    ([0], [])
+    >>> records, aggregate = merge_job(job_dir)
+    >>> [(os.path.basename(f), h, r[1]) for f, h, r, e in records]
+    [('a.csv', 'Alice', 1.12), ('a.csv', 'Ann', 0.56), ('b.csv', 'Bob', 0.672), ('c.csv', 'Carol', 0.0)]
+    >>> round(aggregate.report()['University']['sum'], 4)
+    2.352
+    '''
+    job = load_job(job_dir)
+    records = []
+    aggregate = PopulationAggregate()
+    for shard in range(len(job['shards'])):
+        checkpoint = finished_shard(job_dir, job, shard)
+        if checkpoint is None:
+            raise ValueError('shard ' + str(shard) + ' of ' + job_dir + ' is not finished')
+        records.extend(tuple(record) for record in checkpoint['records'])
+        aggregate.merge(PopulationAggregate.from_dict(checkpoint['aggregate']))
+    return records, aggregate
+
+
+#################################################
+
+def main(argv):
+    '''(list of str) -> int
+    Command line entry point: plan (or resume) a job, run its pending
+    shards and, once every shard is finished, write the merged results
+    and aggregate. Return 1 if shards are left or a file failed, else 0.
+    '''
+    parser = argparse.ArgumentParser(description='Resumable sharded scoring of input files.')
+    parser.add_argument('job_dir')
+    parser.add_argument('pattern', help='directory, glob or file name of the input files')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes (default: run shards in this process)')
+    parser.add_argument('--worker', type=int, default=0, help='index of this host among --workers')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', default='results.csv', help='merged results, relative to job_dir')
+    args = parser.parse_args(argv)
+
+    plan_job(args.job_dir, args.pattern, args.shard_size)
+    executor = ProcessExecutor(args.processes) if args.processes else LocalExecutor()
+    try:
+        run_job(args.job_dir, executor, args.worker, args.workers)
+    finally:
+        executor.close()
+    if pending_shards(args.job_dir):
+        print('shards left to run by other workers', file=sys.stderr)
+        return 1
+
+    records, aggregate = merge_job(args.job_dir)
+    write_results([(fname + ':' + header, results) for fname, header, results, error in records if error is None],
+                  os.path.join(args.job_dir, args.output))
+    write_checkpoint(os.path.join(args.job_dir, 'aggregate.json'), aggregate.report())
+    failures = [(fname, error) for fname, header, results, error in records if error is not None]
+    for fname, error in failures:
+        print(fname + ': ' + error, file=sys.stderr)
+    return 1 if failures else 0
+
+
+#################################################
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))
+    import doctest
+    doctest.testmod()
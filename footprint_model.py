@@ -0,0 +1,177 @@
+# Part 8
+# Compiled linear model of the whole footprint pipeline
+# Author: Yian Bian 260886212
+
+from operator import mul
+
+import footprint_factors as factors
+from footprint_services import fp_of_utilities, fp_of_studies
+from footprint_transport import fp_of_transportation, fp_of_travel
+from footprint_consumption import fp_of_computing, fp_of_diet
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, fall back to plain lists
+    np = None
+
+CATEGORY_NAMES = ['Utilities', 'University', 'Computing', 'Diet', 'Transportation', 'Travel']
+CATEGORY_FUNCTIONS = [fp_of_utilities, fp_of_studies, fp_of_computing, fp_of_diet,
+                      fp_of_transportation, fp_of_travel]
+
+
+#################################################
+
+def parameters(fun):
+    '''(function) -> list of str
+    Return the names of the arguments of fun.
+
+    >>> parameters(fp_of_utilities)
+    ['daily_hydro', 'monthly_gas']
+    '''
+    code = fun.__code__
+    return list(code.co_varnames[:code.co_argcount])
+
+
+def fold(fun, table=None):
+    '''(function, FactorTable) -> (tuple, float)
+    Return the coefficient of every argument of the linear function fun and
+    its intercept, found by evaluating fun once at zero and once per unit
+    input. Every fp_of_* function is linear, so the whole chain of unit
+    conversions inside it folds into a single coefficient per argument.
+    With table, fun is evaluated under those emission factors (passed as
+    its table keyword), leaving the ACTIVE ones alone.
+
+    >>> fold(fp_of_studies)
+    ((0.037333333333333336,), 0.0)
+    >>> fold(fp_of_studies, factors.FactorTable('2', {'student_t_per_fte': 3}))
+    ((0.1,), 0.0)
+    '''
+    n = len(parameters(fun))
+    call = fun if table is None else (lambda *args: fun(*args, table=table))
+    intercept = float(call(*[0] * n))
+    coefficients = []
+    for i in range(n):
+        unit = [0] * n
+        unit[i] = 1
+        coefficients.append(call(*unit) - intercept)
+    return tuple(coefficients), intercept
+
+
+class FootprintModel:
+    '''The six categories as one linear model: category i of a person is
+    intercepts[i] plus the dot product of coefficients[i] with that
+    category's arguments.
+
+    inputs lists the arguments of all six categories in order (the order
+    they appear in an input file), and matrix holds one row per category
+    with a coefficient for every one of those inputs, zero for the inputs
+    the category does not use.
+
+    >>> model = FootprintModel([fp_of_studies, fp_of_utilities], ['University', 'Utilities'])
+    >>> model.inputs
+    ['annual_uni_credits', 'daily_hydro', 'monthly_gas']
+    >>> [round(x, 4) for x in model.score([30, 100, 0])]
+    [1.12, 0.0219]
+    '''
+
+    def __init__(self, functions=CATEGORY_FUNCTIONS, names=CATEGORY_NAMES, table=None):
+        self.functions = list(functions)
+        self.names = list(names)
+        self.inputs = []
+        self.slices = []
+        for fun in self.functions:
+            params = parameters(fun)
+            self.slices.append((len(self.inputs), len(self.inputs) + len(params)))
+            self.inputs.extend(params)
+        self.compile(table)
+
+    def compile(self, table=None):
+        '''(FootprintModel, FactorTable) -> NoneType
+        Fold the functions again under the emission factors of table (the
+        ACTIVE one by default). The table is passed to the functions rather
+        than made ACTIVE, so compiling never changes the factors other
+        callers see. The coefficients are swapped in at once, so a model in
+        use is never left half compiled for long.
+        '''
+        if table is None:
+            table = factors.ACTIVE
+        folded = [fold(fun, table) for fun in self.functions]
+        matrix = []
+        for (start, end), (coefficients, intercept) in zip(self.slices, folded):
+            row = [0.0] * len(self.inputs)
+            row[start:end] = coefficients
+            matrix.append(row)
+        self.coefficients, self.intercepts, self.matrix, self.factor_version = \
+            [c for c, b in folded], [b for c, b in folded], matrix, table.version
+
+    def score(self, args):
+        '''(FootprintModel, list of num) -> list of float
+        Return the result of every category for one person, from the flat
+        list of all their inputs (in the order of self.inputs).
+        '''
+        return [b + sum(map(mul, w, args[start:end]))
+                for w, b, (start, end) in zip(self.coefficients, self.intercepts, self.slices)]
+
+    def score_sections(self, sections):
+        '''(FootprintModel, list of list of num) -> list of float
+        Return the result of every category for one person, from the
+        arguments of each category (the shape read from an input file).
+
+        >>> [round(x, 4) for x in MODEL.score_sections([[48.8, 20], [30], [4, 2, 2, 1, 1],
+        ...                                             [25, 0, 1, 1], [2, 2, 1, 10], [1, 2, 3, 4, 5]])]
+        [0.9632, 1.12, 3.7304, 1.5076, 0.3354, 3.2304]
+        '''
+        return [b + sum(map(mul, w, args))
+                for w, b, args in zip(self.coefficients, self.intercepts, sections)]
+
+    def score_population(self, rows):
+        '''(FootprintModel, list of list of num) -> list of list of float
+        Return the results of every person in rows, one row of inputs per
+        person, as a single matrix multiply: one row of category results
+        per person.
+
+        >>> [[float(round(x, 4)) for x in r] for r in MODEL.score_population([[0] * 21, [1] * 21])]
+        [[0.0, 0.0, 0.0, 1.0556, 0.0, 0.0], [0.0478, 0.0373, 2.3451, 1.2771, 0.1534, 2.5625]]
+        '''
+        if np is not None:
+            return np.asarray(rows, dtype=float) @ np.asarray(self.matrix).T + np.asarray(self.intercepts)
+        return [self.score(row) for row in rows]
+
+    def explain(self, name):
+        '''(FootprintModel, str) -> list of (str, float)
+        Return the inputs of category name with their coefficient (tonnes of
+        CO2E per unit of input), the largest first.
+
+        >>> [(n, round(c, 4)) for n, c in MODEL.explain('Travel')]
+        [('annual_long_flights', 1.9958), ('annual_short_flights', 0.499), ('annual_train', 0.0345), ('annual_coach', 0.033), ('annual_hotels', 0.0003)]
+        '''
+        i = self.names.index(name)
+        start, end = self.slices[i]
+        pairs = zip(self.inputs[start:end], self.coefficients[i])
+        return sorted(pairs, key=lambda pair: -abs(pair[1]))
+
+
+MODEL = FootprintModel()
+
+
+def use_factors(table):
+    '''(FactorTable) -> NoneType
+    Hot-swap the emission factors of the running process: every fp_of_*
+    function and MODEL (with all the batch scoring built on it) use table
+    from now on. MODEL is compiled before ACTIVE changes, so the two are
+    never seen paired with different tables for longer than one assignment.
+
+    >>> use_factors(factors.FactorTable('2', {'hydro_kg_per_mwh': 1.2}))
+    >>> MODEL.factor_version, round(fp_of_utilities(100, 0), 4), round(MODEL.score_sections([[100, 0]])[0], 4)
+    ('2', 0.0438, 0.0438)
+    >>> use_factors(factors.DEFAULT)
+    '''
+    MODEL.compile(table)
+    factors.ACTIVE = table
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
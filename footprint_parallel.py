@@ -0,0 +1,138 @@
+# Part 7
+# Scoring a directory of input files over a process pool
+# Author: Yian Bian 260886212
+
+import glob
+import multiprocessing
+import os
+import sys
+
+from footprint_calculator import calculate_footprint_from_input
+
+
+#################################################
+
+def input_files(pattern):
+    '''(str) -> list of str
+    Return the input files named by pattern, in sorted order: every .csv
+    file when pattern is a directory, otherwise every file matching the
+    glob pattern (a plain file name matches itself).
+
+    >>> input_files(os.path.join('no', 'such', 'dir', '*.csv'))
+    []
+    '''
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.csv')
+    return sorted(glob.glob(pattern))
+
+
+def score_file(fname):
+    '''(str) -> (str, lst, str)
+    Return (fname, results, error) for one input file. A failure does not
+    raise: results is None and error describes what went wrong.
+
+    >>> score_file('no_such_file.csv')[1:]
+    (None, "FileNotFoundError: [Errno 2] No such file or directory: 'no_such_file.csv'")
+    '''
+    try:
+        return fname, calculate_footprint_from_input(fname), None
+    except Exception as e:
+        return fname, None, type(e).__name__ + ': ' + str(e)
+
+
+def format_result(fname, results, error):
+    '''(str, lst, str) -> str
+    Return one tab separated output line: the file name, the six results
+    and their sum, or the error for a file that failed.
+
+    >>> format_result('a.csv', [1, 2, 3, 4, 5, 6.5], None)
+    'a.csv\\t1\\t2\\t3\\t4\\t5\\t6.5\\t21.5'
+    >>> format_result('b.csv', None, 'ValueError: bad')
+    'b.csv\\tERROR\\tValueError: bad'
+    '''
+    if error is not None:
+        return fname + '\tERROR\t' + error
+    total = sum(r for r in results if r != '')
+    return '\t'.join([fname] + [str(r) for r in results] + [str(round(total, 10))])
+
+
+def default_chunksize(n_files, processes):
+    '''(int, int) -> int
+    Return how many files to hand to a worker at once: about four chunks
+    per worker, so every file does not cost a round trip to the pool.
+
+    >>> default_chunksize(500000, 32)
+    3907
+    >>> default_chunksize(3, 32)
+    1
+    '''
+    chunksize, extra = divmod(n_files, processes * 4)
+    if extra:
+        chunksize += 1
+    return max(chunksize, 1)
+
+
+def footprint_calculator_parallel(pattern, processes=None, chunksize=None, output=None):
+    '''(str, int, int, str) -> list
+    Score every input file named by pattern (a directory, a glob or a file
+    name) over a pool of processes workers (default: one per core), handing
+    them chunksize files at a time.
+
+    Results come back in input order. When output is None, return the list
+    of (fname, results, error) for every file; otherwise write one line per
+    file to the file output ('-' for standard output, see format_result)
+    and return only the (fname, error) of the files that failed. A file
+    that fails never stops the run.
+    '''
+    files = input_files(pattern)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = default_chunksize(len(files), processes)
+
+    records = []
+    failures = []
+    if output is None or output == '-':
+        out = None if output is None else sys.stdout
+    else:
+        out = open(output, 'w')
+    try:
+        with multiprocessing.Pool(processes) as pool:
+            for fname, results, error in pool.imap(score_file, files, chunksize):
+                if error is not None:
+                    failures.append((fname, error))
+                if out is None:
+                    records.append((fname, results, error))
+                else:
+                    out.write(format_result(fname, results, error) + '\n')
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+
+    for fname, error in failures:
+        print(fname + ': ' + error, file=sys.stderr)
+    if out is None:
+        return records
+    return failures
+
+
+def main(argv):
+    '''(list of str) -> int
+    Command line entry point: footprint_parallel.py PATTERN [OUTPUT]
+    [PROCESSES], writing to standard output by default. Return 1 if any
+    file failed, else 0.
+    '''
+    pattern = argv[0]
+    output = argv[1] if len(argv) > 1 else '-'
+    processes = int(argv[2]) if len(argv) > 2 else None
+    failures = footprint_calculator_parallel(pattern, processes, output=output)
+    return 1 if failures else 0
+
+
+#################################################
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))
+    import doctest
+    doctest.testmod()
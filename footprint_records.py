@@ -0,0 +1,295 @@
+# Part 18
+# Compact records of people, their results and whole populations
+# Author: Yian Bian 260886212
+
+import math
+import sys
+import tempfile
+from array import array
+
+from footprint_calculator import read_sections_from_stream
+from footprint_model import MODEL, CATEGORY_NAMES
+from footprint_batch import calculate_footprint_batch
+from footprint_columnar import write_columnar, schema
+
+INPUTS = MODEL.inputs
+RESULTS = [name.lower() for name in CATEGORY_NAMES]
+
+
+#################################################
+
+def _section_slices():
+    '''() -> list of slice
+    Return the slice of the flat inputs taken by every section.'''
+    return [slice(start, end) for start, end in MODEL.slices]
+
+
+class Person:
+    '''The inputs of one person, one attribute per argument of the six
+    functions (daily_hydro, monthly_gas, ...), None for a section left
+    empty. Slotted, so a Person has no per-instance dict.
+
+    >>> p = Person.from_sections('Alice', [[48.8, 20], [30], [], [], [], []])
+    >>> p.daily_hydro, p.annual_uni_credits, p.daily_g_meat
+    (48.8, 30, None)
+    >>> p.to_sections()
+    [[48.8, 20], [30], [], [], [], []]
+    '''
+
+    __slots__ = ['header'] + INPUTS
+
+    def __init__(self, header='', **inputs):
+        self.header = header
+        for name in INPUTS:
+            setattr(self, name, inputs.get(name))
+
+    @classmethod
+    def from_sections(cls, header, sections):
+        '''(str, list of lst) -> Person
+        Return the person with the arguments of each of their six sections,
+        the shape read by read_sections_from_stream.'''
+        person = cls(header)
+        for s, args in zip(_section_slices(), sections):
+            if len(args) and len(args) != s.stop - s.start:
+                raise ValueError(header + ': expected ' + str(s.stop - s.start) + ' values in a section, got ' + str(len(args)))
+            for name, val in zip(INPUTS[s], args):
+                setattr(person, name, val)
+        return person
+
+    def to_sections(self):
+        '''(Person) -> list of lst
+        Return the arguments of each of the six sections, [] for a
+        section left empty.'''
+        sections = []
+        for s in _section_slices():
+            args = [getattr(self, name) for name in INPUTS[s]]
+            sections.append([] if None in args else args)
+        return sections
+
+    def __repr__(self):
+        return 'Person(' + repr(self.header) + ')'
+
+
+class Result:
+    '''The result of every category for one person, None for a section
+    left empty, and their total.
+
+    >>> r = Result.from_list('Alice', [1.0, 2.0, '', 0.5, 0.0, 3.0])
+    >>> r.university, r.computing, r.total
+    (2.0, None, 6.5)
+    >>> r.to_list()
+    [1.0, 2.0, '', 0.5, 0.0, 3.0]
+    '''
+
+    __slots__ = ['header'] + RESULTS
+
+    def __init__(self, header='', **results):
+        self.header = header
+        for name in RESULTS:
+            setattr(self, name, results.get(name))
+
+    @classmethod
+    def from_list(cls, header, results):
+        '''(str, lst) -> Result
+        Return the Result of a list of six results ('' for empty).'''
+        result = cls(header)
+        for name, r in zip(RESULTS, results):
+            setattr(result, name, None if r == '' else r)
+        return result
+
+    def to_list(self):
+        '''(Result) -> lst
+        Return the list of six results, '' for empty sections.'''
+        return ['' if getattr(self, name) is None else getattr(self, name) for name in RESULTS]
+
+    @property
+    def total(self):
+        '''(Result) -> float
+        Return the sum of the results, skipping empty sections.'''
+        return math.fsum(getattr(self, name) for name in RESULTS if getattr(self, name) is not None)
+
+    def __repr__(self):
+        return 'Result(' + repr(self.header) + ', ' + repr(self.to_list()) + ')'
+
+
+#################################################
+
+def _to_array(column):
+    '''(sequence) -> array
+    Return column as an array of doubles, copying a numpy array's buffer
+    directly instead of one float at a time.
+
+    >>> _to_array([1, 2.5])
+    array('d', [1.0, 2.5])
+    '''
+    result = array('d')
+    if hasattr(column, 'tobytes') and getattr(column, 'dtype', None) == 'float64':
+        result.frombytes(column.tobytes())
+    else:
+        result.extend(float(x) for x in column)
+    return result
+
+
+class Population:
+    '''Many people as a struct of arrays: one contiguous array of doubles
+    per input and, once scored, per result, with nan for missing values
+    (8 bytes per value instead of a Python float in a list). Headers are
+    kept in a list unless keep_headers is False.
+
+    >>> population = Population()
+    >>> population.append('Alice', [[48.8, 20], [30], [4, 2, 2, 1, 1], [25, 0, 1, 1], [2, 2, 1, 10], [1, 2, 3, 4, 5]])
+    >>> population.append('Bob', [[0, 0], [18], [], [], [], []])
+    >>> len(population), population[1].to_sections()[:3]
+    (2, [[0.0, 0.0], [18.0], []])
+    >>> population.score()
+    >>> [round(r, 4) for r in population.results_list(0)]
+    [0.9632, 1.12, 3.7304, 1.5076, 0.3354, 3.2304]
+    >>> population.result(1).to_list()[1:3]
+    [0.672, '']
+    >>> Population.from_people(population.to_people()).to_people() == population.to_people()
+    True
+    '''
+
+    def __init__(self, keep_headers=True):
+        self.inputs = [array('d') for name in INPUTS]
+        self.results = None
+        self.headers = [] if keep_headers else None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def rows(self):
+        '''(Population) -> int
+        Return the number of people, as ColumnarPopulation.rows does.'''
+        return self.size
+
+    @classmethod
+    def from_people(cls, people, headers=None):
+        '''(list of list of lst, list of str) -> Population
+        Return the population of people, each the arguments of their six
+        sections as taken by calculate_footprint_people.'''
+        population = cls(keep_headers=headers is not None)
+        for i, sections in enumerate(people):
+            population.append(headers[i] if headers is not None else '', sections)
+        return population
+
+    def to_people(self):
+        '''(Population) -> list of list of lst
+        Return the arguments of the six sections of every person, the
+        inverse of from_people.'''
+        return [self.sections(i) for i in range(self.size)]
+
+    def append(self, header, sections):
+        '''(Population, str, list of lst) -> NoneType
+        Add a person from the arguments of their six sections.'''
+        nan = math.nan
+        for s, args in zip(_section_slices(), sections):
+            width = s.stop - s.start
+            if not len(args):
+                args = [nan] * width
+            elif len(args) != width:
+                raise ValueError(header + ': expected ' + str(width) + ' values in a section, got ' + str(len(args)))
+            for column, val in zip(self.inputs[s], args):
+                column.append(val)
+        if self.headers is not None:
+            self.headers.append(header)
+        self.size += 1
+        self.results = None
+
+    def append_person(self, person):
+        '''(Population, Person) -> NoneType
+        Add person.'''
+        self.append(person.header, person.to_sections())
+
+    def extend_from_stream(self, f):
+        '''(Population, file) -> Population
+        Add every person in the open input file f and return self.'''
+        for header, sections in read_sections_from_stream(f):
+            self.append(header, sections)
+        return self
+
+    def header(self, i):
+        '''(Population, int) -> str
+        Return the header of person i, or '' if headers are not kept.'''
+        return self.headers[i] if self.headers is not None else ''
+
+    def sections(self, i):
+        '''(Population, int) -> list of lst
+        Return the arguments of each section of person i, [] for empty.'''
+        sections = []
+        for s in _section_slices():
+            args = [column[i] for column in self.inputs[s]]
+            sections.append([] if any(x != x for x in args) else args)
+        return sections
+
+    def __getitem__(self, i):
+        if not -self.size <= i < self.size:
+            raise IndexError('population index out of range')
+        i %= self.size
+        return Person.from_sections(self.header(i), self.sections(i))
+
+    def column(self, name):
+        '''(Population, str) -> array
+        Return the column of input name, as ColumnarPopulation.column.'''
+        return self.inputs[INPUTS.index(name)]
+
+    def category_columns(self):
+        '''(Population) -> list of list of array
+        Return the input columns of every category, the shape taken by
+        calculate_footprint_batch.'''
+        return [self.inputs[s] for s in _section_slices()]
+
+    def score(self):
+        '''(Population) -> NoneType
+        Score every person in one batch pass per category.'''
+        self.results = [_to_array(column) for column in calculate_footprint_batch(self.category_columns())]
+
+    def results_list(self, i):
+        '''(Population, int) -> lst
+        Return the results of person i in the shape of
+        calculate_footprint_from_input, '' for empty sections.'''
+        if self.results is None:
+            self.score()
+        return ['' if column[i] != column[i] else column[i] for column in self.results]
+
+    def to_results(self):
+        '''(Population) -> list of lst
+        Return the results of every person, as calculate_footprint_people.'''
+        return [self.results_list(i) for i in range(self.size)]
+
+    def result(self, i):
+        '''(Population, int) -> Result
+        Return the results of person i.'''
+        return Result.from_list(self.header(i), self.results_list(i))
+
+    def nbytes(self):
+        '''(Population) -> int
+        Return the size of the input and result arrays in bytes.'''
+        arrays = self.inputs + (self.results or [])
+        return sum(column.itemsize * len(column) for column in arrays)
+
+    def to_columnar(self, fname):
+        '''(Population, str) -> NoneType
+        Write the inputs in the columnar format of footprint_columnar.'''
+        spills = []
+        try:
+            for column in self.inputs:
+                out = tempfile.TemporaryFile()
+                if sys.byteorder != 'little':
+                    column = array('d', column)
+                    column.byteswap()
+                column.tofile(out)
+                spills.append(out)
+            write_columnar(fname, spills, self.size, INPUTS, schema())
+        finally:
+            for out in spills:
+                out.close()
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,148 @@
+# Part 16
+# What-if scenarios over a scored population
+# Author: Yian Bian 260886212
+
+import math
+
+from footprint_model import MODEL
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, fall back to plain lists
+    np = None
+
+
+#################################################
+
+class Scenario:
+    '''A change to the inputs of a population: every input named in scale
+    is multiplied by its factor, then every input named in add is shifted
+    by its amount, and the new value is never allowed below floor (nobody
+    takes fewer than zero flights).
+
+    >>> Scenario('one fewer long flight', add={'annual_long_flights': -1}).new_value('annual_long_flights', 3)
+    2
+    >>> Scenario('20% less meat', scale={'daily_g_meat': 0.8}).new_value('daily_g_meat', 100)
+    80.0
+    '''
+
+    def __init__(self, name, add=None, scale=None, floor=0.0):
+        self.name = name
+        self.add = dict(add or {})
+        self.scale = dict(scale or {})
+        self.floor = floor
+        for input_name in list(self.add) + list(self.scale):
+            if input_name not in MODEL.inputs:
+                raise ValueError('unknown input ' + input_name)
+
+    def changed_inputs(self):
+        '''(Scenario) -> list of str
+        Return the inputs this scenario changes, in model order.'''
+        return [name for name in MODEL.inputs if name in self.add or name in self.scale]
+
+    def new_value(self, name, x):
+        '''(Scenario, str, num) -> num
+        Return the value of input name after the change, from its value x.'''
+        return max(self.floor, x * self.scale.get(name, 1) + self.add.get(name, 0))
+
+
+def get_column(population, name):
+    '''(object, str) -> sequence
+    Return the column of input name of population: a ColumnarPopulation,
+    or a dict of columns keyed by input name.'''
+    if hasattr(population, 'column'):
+        return population.column(name)
+    return population[name]
+
+
+def population_size(population):
+    '''(object) -> int
+    Return the number of people in population (see get_column).
+
+    >>> population_size({'annual_coach': [1, 2, 3]})
+    3
+    '''
+    if hasattr(population, 'rows'):
+        return population.rows
+    return len(next(iter(population.values())))
+
+
+def input_delta(scenario, name, column):
+    '''(Scenario, str, sequence) -> sequence
+    Return how much scenario changes every value of the input column name.
+    A missing value (nan, a section left empty) does not change.
+
+    >>> list(map(float, input_delta(Scenario('x', add={'annual_coach': -1}), 'annual_coach', [0, 2, float('nan')])))
+    [0.0, -1.0, 0.0]
+    '''
+    scale = scenario.scale.get(name, 1)
+    add = scenario.add.get(name, 0)
+    if np is not None:
+        x = np.asarray(column, dtype=float)
+        return np.nan_to_num(np.maximum(scenario.floor, x * scale + add) - x)
+    floor = scenario.floor
+    return [0.0 if x != x else float(max(floor, x * scale + add) - x) for x in column]
+
+
+def evaluate_scenario(population, scenario, model=MODEL):
+    '''(object, Scenario, FootprintModel) -> dict
+    Return the change scenario makes to the footprint of every person of
+    population, and in aggregate. Only the changed inputs are read: the
+    categories are linear, so the change of a category is the sum over its
+    changed inputs of coefficient * change of input, whatever the baseline.
+
+    The result holds 'categories', the per-person change of every category
+    that the scenario touches, 'total', the per-person change of the total,
+    and 'aggregate', the summed change of every category and of the total
+    over the whole population, with the number of people.
+
+    >>> population = {'annual_long_flights': [0, 1, 3], 'daily_g_meat': [100, 0, 50]}
+    >>> result = evaluate_scenario(population, Scenario('fly less', add={'annual_long_flights': -1}))
+    >>> [float(round(x, 4)) for x in result['total']]
+    [0.0, -1.9958, -1.9958]
+    >>> round(result['aggregate']['Travel'], 4), result['aggregate']['people']
+    (-3.9916, 3)
+    '''
+    deltas = {}
+    for name in scenario.changed_inputs():
+        i = model.inputs.index(name)
+        category = next(c for c, (start, end) in enumerate(model.slices) if start <= i < end)
+        coefficient = model.coefficients[category][i - model.slices[category][0]]
+        change = input_delta(scenario, name, get_column(population, name))
+        if np is not None:
+            change = coefficient * change
+            deltas[category] = deltas[category] + change if category in deltas else change
+        elif category in deltas:
+            deltas[category] = [d + coefficient * c for d, c in zip(deltas[category], change)]
+        else:
+            deltas[category] = [coefficient * c for c in change]
+
+    categories = {model.names[c]: delta for c, delta in sorted(deltas.items())}
+    columns = list(categories.values())
+    if not columns:
+        n = population_size(population)
+        total = np.zeros(n) if np is not None else [0.0] * n
+    elif np is not None:
+        total = sum(columns[1:], columns[0])
+    else:
+        total = [math.fsum(values) for values in zip(*columns)]
+
+    aggregate = {name: 0.0 for name in model.names}
+    for name, delta in categories.items():
+        aggregate[name] = float(math.fsum(delta))
+    aggregate['Total'] = float(math.fsum(total))
+    aggregate['people'] = len(total)
+    return {'name': scenario.name, 'categories': categories, 'total': total, 'aggregate': aggregate}
+
+
+def evaluate_scenarios(population, scenarios, model=MODEL):
+    '''(object, list of Scenario, FootprintModel) -> dict
+    Return evaluate_scenario of every scenario, keyed by scenario name.'''
+    return {scenario.name: evaluate_scenario(population, scenario, model) for scenario in scenarios}
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,278 @@
+# Part 24
+# Input files parsed through a declared schema, with errors collected
+# Author: Yian Bian 260886212
+
+import csv
+import re
+
+from footprint_model import MODEL
+from footprint_calculator import calculate_section
+
+DELIMITER = '-' * 8
+MAX_ERRORS = 1000
+
+
+#################################################
+
+def normalize(label):
+    '''(str) -> str
+    Return label reduced for matching: without what is in parentheses,
+    lower case, with only its letters and digits.
+
+    >>> normalize('Daily hydro (kWh)'), normalize('daily_hydro')
+    ('dailyhydro', 'dailyhydro')
+    '''
+    return re.sub(r'[^a-z0-9]', '', re.sub(r'\(.*?\)', '', label.lower()))
+
+
+class Field:
+    '''One argument of a section: its name, the value used when a file
+    leaves it out, and other labels a row may give it.'''
+
+    __slots__ = ['name', 'default', 'aliases']
+
+    def __init__(self, name, default=0.0, aliases=()):
+        self.name = name
+        self.default = default
+        self.aliases = tuple(aliases)
+
+    def __repr__(self):
+        return 'Field(' + repr(self.name) + ')'
+
+
+def default_schema(model=MODEL):
+    '''(FootprintModel) -> list of (str, list of Field)
+    Return the schema of the usual input file: every category of model
+    with a field per argument of its function, defaulting to 0.
+
+    >>> default_schema()[1]
+    ('University', [Field('annual_uni_credits')])
+    '''
+    return [(name, [Field(arg) for arg in model.inputs[start:end]])
+            for name, (start, end) in zip(model.names, model.slices)]
+
+
+class CompiledSchema:
+    '''A schema compiled once into what parsing needs per row: for every
+    section, a dict from normalized label to argument slot, and the
+    defaults to fill in.
+
+    >>> schema = CompiledSchema(default_schema())
+    >>> schema.names[:2], schema.slot(0, 'Monthly gas ($)')
+    (['Utilities', 'University'], 1)
+    '''
+
+    def __init__(self, schema):
+        self.names = [name for name, fields in schema]
+        self.fields = [[field.name for field in fields] for name, fields in schema]
+        self.defaults = [[field.default for field in fields] for name, fields in schema]
+        self.labels = []
+        for name, fields in schema:
+            labels = {}
+            for slot, field in enumerate(fields):
+                for label in (field.name,) + field.aliases:
+                    key = normalize(label)
+                    if key in labels and labels[key] != slot:
+                        raise ValueError(name + ': label ' + label + ' names two fields')
+                    labels[key] = slot
+            self.labels.append(labels)
+
+    def slot(self, section, label):
+        '''(CompiledSchema, int, str) -> int
+        Return the argument slot of label in section, or None.'''
+        return self.labels[section].get(normalize(label))
+
+
+SCHEMA = CompiledSchema(default_schema())
+
+
+#################################################
+
+class ParseError:
+    '''What went wrong, and where: a file name, a line number and the
+    header of the person being read.'''
+
+    __slots__ = ['fname', 'line', 'person', 'message']
+
+    def __init__(self, fname, line, person, message):
+        self.fname = fname
+        self.line = line
+        self.person = person
+        self.message = message
+
+    def __str__(self):
+        return self.fname + ':' + str(self.line) + ': ' + (self.person + ': ' if self.person else '') + self.message
+
+
+class ErrorLog:
+    '''The errors of a whole batch of files. Every error is counted, but
+    only the first limit are kept, so a batch full of bad files cannot use
+    up the memory of the run.'''
+
+    def __init__(self, limit=MAX_ERRORS):
+        self.limit = limit
+        self.errors = []
+        self.count = 0
+        self.files = set()
+
+    def add(self, error):
+        '''(ErrorLog, ParseError) -> NoneType
+        Record error.'''
+        self.count += 1
+        self.files.add(error.fname)
+        if len(self.errors) < self.limit:
+            self.errors.append(error)
+
+    def __len__(self):
+        return self.count
+
+    def summary(self):
+        '''(ErrorLog) -> str
+        Return one line per kept error and a count of the others.'''
+        lines = [str(error) for error in self.errors]
+        if self.count > len(self.errors):
+            lines.append('... and ' + str(self.count - len(self.errors)) + ' more errors')
+        return '\n'.join(lines)
+
+
+def _person(header, line, schema):
+    '''(str, int, CompiledSchema) -> dict
+    Return the parsing state of a person whose header is on line: the
+    section being read, the values read so far (None when not given), the
+    next slot to fill positionally and whether no error was found.'''
+    return {'header': header, 'line': line, 'section': -1,
+            'values': [[None] * len(fields) for fields in schema.fields], 'next': 0, 'ok': True}
+
+
+def _finish(person, schema):
+    '''(dict, CompiledSchema) -> list of lst
+    Return the sections of person, with defaults for the fields left
+    out of a section that has any value, [] for an empty section.'''
+    sections = []
+    for values, defaults in zip(person['values'], schema.defaults):
+        if all(value is None for value in values):
+            sections.append([])
+        else:
+            sections.append([d if value is None else value for value, d in zip(values, defaults)])
+    return sections
+
+
+def parse_stream(f, schema=SCHEMA, fname='<stream>', errors=None, strict=False):
+    '''(file, CompiledSchema, str, ErrorLog, bool) -> iterator of (str, list of lst)
+    Read every person in the open file f, in the layout of
+    read_sections_from_stream, through schema. A row 'label,value' fills
+    the field its label names, whatever its position; a row without a label
+    fills the next field not yet filled, as does a row whose label the
+    schema does not know (the free text of older files) unless strict, when
+    it is an error; a blank value keeps the default.
+    Yield (header, sections) for every person read without error. The
+    errors of the others go to errors (an ErrorLog) and do not stop the
+    file.
+
+    >>> import io
+    >>> log = ErrorLog()
+    >>> data = io.StringIO("Alice\\n--------\\nMonthly gas ($),20\\nDaily hydro (kWh),48.8\\n--------\\n,30\\n"
+    ...                    "--------\\n--------\\ndaily_g_meat,25\\n--------\\n--------\\n--------\\n"
+    ...                    "Bob\\n--------\\nhydro,1\\n--------\\n,x\\n")
+    >>> for header, sections in parse_stream(data, errors=log, strict=True):
+    ...     print(header, sections)
+    Alice [[48.8, 20.0], [30.0], [], [25.0, 0.0, 0.0, 0.0], [], []]
+    >>> print(log.summary())
+    <stream>:15: Bob: Utilities has no field hydro
+    <stream>:17: Bob: University value 'x' is not a number
+    >>> data = io.StringIO("Alice\\n--------\\nHydro used every day,48.8\\nGas bill,20\\n" + "--------\\n" * 6)
+    >>> list(parse_stream(data))
+    [('Alice', [[48.8, 20.0], [], [], [], [], []])]
+    '''
+    if errors is None:
+        errors = ErrorLog()
+    n_sections = len(schema.names)
+    person = None
+
+    def error(line, message):
+        '''(int, str) -> NoneType
+        Record message about line of the person being read.'''
+        person['ok'] = False
+        errors.add(ParseError(fname, line, person['header'], message))
+
+    reader = csv.reader(f)
+    for row in reader:
+        line = reader.line_num
+        if person is None:
+            if row and ''.join(row).strip():
+                person = _person(','.join(row).strip(), line, schema)
+            continue
+        if row and DELIMITER in row[0]:
+            person['section'] += 1
+            person['next'] = 0
+            if person['section'] == n_sections:
+                if person['ok']:
+                    yield person['header'], _finish(person, schema)
+                person = None
+            continue
+
+        section = person['section']
+        if section < 0 or not row:
+            continue
+        text = row[-1].strip()
+        label = row[0].strip() if len(row) > 1 else ''
+        values = person['values'][section]
+        name = schema.names[section]
+        slot = schema.slot(section, label) if label else None
+        if slot is None and label and strict:
+            error(line, name + ' has no field ' + label)
+            continue
+        if slot is None:
+            slot = person['next']
+            while slot < len(values) and values[slot] is not None:
+                slot += 1
+            if slot == len(values):
+                error(line, name + ' takes ' + str(len(values)) + ' values')
+                continue
+            person['next'] = slot + 1
+        if values[slot] is not None:
+            error(line, name + ' field ' + schema.fields[section][slot] + ' is given twice')
+            continue
+        if not text:
+            continue
+        try:
+            values[slot] = float(text)
+        except ValueError:
+            error(line, name + ' value ' + repr(text) + ' is not a number')
+
+    if person is not None and person['ok']: # the last person had no closing '--------'
+        yield person['header'], _finish(person, schema)
+
+
+def parse_file(fname, schema=SCHEMA, errors=None, strict=False):
+    '''(str, CompiledSchema, ErrorLog, bool) -> iterator of (str, list of lst)
+    Yield every person read without error from the file with name fname,
+    one at a time, so a file of any size is streamed; a file that cannot
+    be opened or read is an error too, ending the file.'''
+    if errors is None:
+        errors = ErrorLog()
+    try:
+        with open(fname, 'r', newline='') as f:
+            yield from parse_stream(f, schema, fname, errors, strict)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        errors.add(ParseError(fname, 0, '', type(e).__name__ + ': ' + str(e)))
+
+
+def calculate_footprints_checked(fnames, schema=SCHEMA, errors=None, strict=False):
+    '''(iterable of str, CompiledSchema, ErrorLog, bool) -> iterator of (str, str, lst)
+    Score every person of every file in fnames, yielding (fname, header,
+    results) with results in the shape of calculate_footprint_from_input.
+    Files and people with errors are skipped and their errors collected in
+    errors, so a bad file never stops the batch.'''
+    if errors is None:
+        errors = ErrorLog()
+    for fname in fnames:
+        for header, sections in parse_file(fname, schema, errors, strict):
+            yield fname, header, [calculate_section(i, args) for i, args in enumerate(sections)]
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
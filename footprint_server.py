@@ -0,0 +1,248 @@
+# Part 14
+# Asyncio scoring service with request micro-batching
+# Author: Yian Bian 260886212
+
+import argparse
+import asyncio
+import json
+import sys
+
+from footprint_batch import calculate_footprint_people
+from footprint_model import CATEGORY_NAMES, MODEL
+
+MAX_BATCH_SIZE = 256
+MAX_WAIT = 0.002 # seconds
+MAX_BODY = 1 << 20
+
+
+#################################################
+
+class MicroBatcher:
+    '''Coalesce concurrent requests into batches of at most max_batch_size
+    items, waiting at most max_wait seconds after the first item of a batch
+    for more to arrive, and score every batch with one call of score_batch
+    (a function from a list of items to the list of their results).
+
+    >>> async def demo():
+    ...     batcher = MicroBatcher(lambda items: [x * 2 for x in items], max_batch_size=3)
+    ...     worker = asyncio.ensure_future(batcher.run())
+    ...     results = await asyncio.gather(*[batcher.submit(x) for x in range(5)])
+    ...     worker.cancel()
+    ...     return results, batcher.stats()['batch_sizes']
+    >>> asyncio.run(demo())
+    ([0, 2, 4, 6, 8], {2: 1, 3: 1})
+    '''
+
+    def __init__(self, score_batch, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.requests = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = {}
+
+    async def submit(self, item):
+        '''(MicroBatcher, object) -> object
+        Queue item for the next batch and return its result once scored.'''
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future))
+        self.requests += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return await future
+
+    async def next_batch(self):
+        '''(MicroBatcher) -> list of (object, Future)
+        Wait for an item, then for up to max_wait seconds for more.'''
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def score(self, batch):
+        '''(MicroBatcher, list of (object, Future)) -> NoneType
+        Score batch in one pass and fan the results out to the requests. If
+        the batch fails, score its items one by one so that a single bad
+        request only fails itself.'''
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        self.batches += 1
+        self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+        try:
+            results = self.score_batch([item for item, future in batch])
+        except Exception:
+            for item, future in batch:
+                try:
+                    future.set_result(self.score_batch([item])[0])
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        for (item, future), result in zip(batch, results):
+            future.set_result(result)
+
+    async def run(self):
+        '''(MicroBatcher) -> NoneType
+        Score batches forever.'''
+        while True:
+            self.score(await self.next_batch())
+
+    def stats(self):
+        '''(MicroBatcher) -> dict
+        Return the queue depth and batch size statistics.'''
+        return {'queue_depth': self.queue.qsize(), 'max_queue_depth': self.max_queue_depth,
+                'requests': self.requests, 'batches': self.batches,
+                'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'batch_sizes': dict(sorted(self.batch_sizes.items()))}
+
+
+def parse_request(body):
+    '''(bytes) -> list of lst
+    Return the sections of the person in the JSON request body, an object
+    with a "sections" list holding the values of each of the six sections
+    in input file order (an empty list for a section left empty). A section
+    with the wrong number of values is refused here, before it is queued,
+    so it cannot fail the batch it would have been scored with.
+
+    >>> parse_request(b'{"sections": [[48.8, 20], [30], [], [], [], []]}')
+    [[48.8, 20.0], [30.0], [], [], [], []]
+    >>> parse_request(b'{"sections": [[1]]}')
+    Traceback (most recent call last):
+    ValueError: expected 6 sections
+    >>> parse_request(b'{"sections": [[48.8], [30], [], [], [], []]}')
+    Traceback (most recent call last):
+    ValueError: Utilities: expected 2 values, got 1
+    '''
+    sections = json.loads(body)['sections']
+    if not isinstance(sections, list) or len(sections) != len(CATEGORY_NAMES):
+        raise ValueError('expected ' + str(len(CATEGORY_NAMES)) + ' sections')
+    for name, (start, end), args in zip(MODEL.names, MODEL.slices, sections):
+        if not isinstance(args, list):
+            raise ValueError(name + ': expected a list of values')
+        if args and len(args) != end - start:
+            raise ValueError(name + ': expected ' + str(end - start) + ' values, got ' + str(len(args)))
+    return [[float(val) for val in args] for args in sections]
+
+
+def format_response(results):
+    '''(lst) -> dict
+    Return the JSON response for results, with None for empty sections.
+
+    >>> format_response([1.0, '', 2.0, '', '', ''])
+    {'results': {'Utilities': 1.0, 'University': None, 'Computing': 2.0, 'Diet': None, 'Transportation': None, 'Travel': None}, 'total': 3.0}
+    '''
+    values = [None if r == '' else r for r in results]
+    return {'results': dict(zip(CATEGORY_NAMES, values)),
+            'total': sum(v for v in values if v is not None)}
+
+
+#################################################
+
+class FootprintServer:
+    '''A small HTTP/1.1 server: POST / with a JSON body (see parse_request)
+    returns the footprint of that person, GET /stats returns the batcher
+    statistics. Concurrent requests are scored together by a MicroBatcher.
+    '''
+
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT):
+        self.batcher = MicroBatcher(calculate_footprint_people, max_batch_size, max_wait)
+
+    async def respond(self, writer, status, payload, keep_alive):
+        '''(FootprintServer, StreamWriter, str, dict, bool) -> NoneType
+        Send payload as a JSON response with the given status.'''
+        body = json.dumps(payload).encode()
+        writer.write(('HTTP/1.1 ' + status + '\r\nContent-Type: application/json\r\n'
+                      'Content-Length: ' + str(len(body)) + '\r\n'
+                      'Connection: ' + ('keep-alive' if keep_alive else 'close') + '\r\n\r\n').encode() + body)
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        '''(FootprintServer, StreamReader, StreamWriter) -> NoneType
+        Serve the requests of one connection.'''
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path = request_line.decode('latin-1').split()[:2]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    await self.respond(writer, '413 Payload Too Large', {'error': 'request too large'}, False)
+                    break
+                body = await reader.readexactly(length)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+
+                if method == 'GET' and path == '/stats':
+                    await self.respond(writer, '200 OK', self.batcher.stats(), keep_alive)
+                elif method == 'POST':
+                    try:
+                        results = await self.batcher.submit(parse_request(body))
+                    except (ValueError, TypeError, KeyError) as e:
+                        await self.respond(writer, '400 Bad Request', {'error': str(e)}, keep_alive)
+                    else:
+                        await self.respond(writer, '200 OK', format_response(results), keep_alive)
+                else:
+                    await self.respond(writer, '404 Not Found', {'error': 'not found'}, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        '''(FootprintServer, str, int) -> NoneType
+        Serve forever on host:port.'''
+        worker = asyncio.ensure_future(self.batcher.run())
+        server = await asyncio.start_server(self.handle, host, port)
+        print('Serving footprints on http://' + host + ':' + str(port), file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            worker.cancel()
+
+
+def main(argv):
+    '''(list of str) -> NoneType
+    Command line entry point.'''
+    parser = argparse.ArgumentParser(description='Serve footprint calculations over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT * 1000)
+    options = parser.parse_args(argv)
+    server = FootprintServer(options.max_batch_size, options.max_wait_ms / 1000)
+    try:
+        asyncio.run(server.serve(options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+
+
+#################################################
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--doctest':
+        import doctest
+        doctest.testmod()
+    else:
+        main(sys.argv[1:])
@@ -2,16 +2,16 @@
 # Footprint of utilities & university
 # Author: Yian Bian 260886212
 
-import doctest
 from unit_conversion import *
+import footprint_factors as factors
 
 ######################################### Utilities
-days_in_year = 365.2425
-pound_in_kg = 0.45359237
-kg_in_tonne = 0.001
-kwh_in_mwh = 0.001
+days_in_year = UNITS.factor('year', 'day')
+pound_in_kg = UNITS.factor('lb', 'kg')
+kg_in_tonne = UNITS.factor('kg', 't')
+kwh_in_mwh = UNITS.factor('kWh', 'MWh')
 
-def fp_from_gas(monthly_gas):
+def fp_from_gas(monthly_gas, *, table=None):
     '''(num) -> float
     Calculate metric tonnes of CO2E produced annually
     based on monthly natural gas bill in $.
@@ -26,14 +26,15 @@ def fp_from_gas(monthly_gas):
     >>> round(fp_from_gas(25), 4)
     1.1907
     '''
-    gas_in_pound = monthly_gas * 105 # use the monthly bill to calculate the amouunt
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
+    gas_in_pound = monthly_gas * table['gas_lb_per_dollar'] # use the monthly bill to calculate the amouunt
     gas_in_kg = pound_in_kg * gas_in_pound # convert lbs to kg
     fp_from_gas = gas_in_kg * kg_in_tonne # covert kg to tonne
     return fp_from_gas
 
 
 
-def fp_from_hydro(daily_hydro):
+def fp_from_hydro(daily_hydro, *, table=None):
     '''(num) -> float
     Calculate metric tonnes of CO2E produced annually
     based on average daily hydro usage.
@@ -52,14 +53,15 @@ def fp_from_hydro(daily_hydro):
     >>> round(fp_from_hydro(48.8), 4)
     0.0107
     '''
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
     daily_hydro_in_mwh = daily_hydro * kwh_in_mwh #covert kwh to mwh
-    daily_in_tonne = daily_hydro_in_mwh * 0.6 * kg_in_tonne # use the data to calculate the kg of CO2E and covert the kg to tonne
+    daily_in_tonne = daily_hydro_in_mwh * table['hydro_kg_per_mwh'] * kg_in_tonne # use the data to calculate the kg of CO2E and covert the kg to tonne
     fp_from_hydro = daily_in_tonne * days_in_year # use the tonnes of CO2E that daily produced to multiply the days in a year to calculate the tonnes of CO2E that annualy produced
     return fp_from_hydro
 
 
 
-def fp_of_utilities(daily_hydro, monthly_gas):
+def fp_of_utilities(daily_hydro, monthly_gas, *, table=None):
     '''(num, num, num) -> float
     Calculate metric tonnes of CO2E produced annually from
     daily hydro (in kWh) and gas bills (in $) and monthly phone data (in GB).
@@ -73,10 +75,11 @@ def fp_of_utilities(daily_hydro, monthly_gas):
     >>> round(fp_of_utilities(50, 20), 4)
     0.9635
     '''
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
     daily_hydro_in_mwh = daily_hydro * kwh_in_mwh # covert kwh to mwh
-    daily_in_tonne = daily_hydro_in_mwh * 0.6 * kg_in_tonne # use the data to calculate the kg of CO2E and covert the kg to tonne
+    daily_in_tonne = daily_hydro_in_mwh * table['hydro_kg_per_mwh'] * kg_in_tonne # use the data to calculate the kg of CO2E and covert the kg to tonne
     fp_from_hydro = daily_in_tonne * days_in_year # use the tonnes of CO2E that daily produced to multiply the days in a year to calculate the tonnes of CO2E that annualy produced
-    gas_in_pound = monthly_gas * 105 # use the monthly bill to calculate the amouunt
+    gas_in_pound = monthly_gas * table['gas_lb_per_dollar'] # use the monthly bill to calculate the amouunt
     gas_in_kg = pound_in_kg * gas_in_pound # convert lbs to kg
     fp_from_gas = gas_in_kg * kg_in_tonne # covert kg to tonne
     fp_of_utilities = fp_from_hydro + fp_from_gas
@@ -86,7 +89,7 @@ def fp_of_utilities(daily_hydro, monthly_gas):
 #################################################
 
 
-def fp_of_studies(annual_uni_credits):
+def fp_of_studies(annual_uni_credits, *, table=None):
     '''(num, num, num) -> flt
     Return metric tonnes of CO2E from being a student, based on
     annual university credits.
@@ -101,12 +104,14 @@ def fp_of_studies(annual_uni_credits):
     >>> round(fp_of_studies(18), 4)
     0.672
     '''
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
     number_of_PTE_student = annual_uni_credits / 30 # use the annual university credits to divided by 30 to have the number of the PTE student
-    fp_of_studies = number_of_PTE_student * 1.12 # use the number of PTE to multiply the tonnes of CO2E per PTE student to get the toones if CO2E from being a student
+    fp_of_studies = number_of_PTE_student * table['student_t_per_fte'] # use the number of PTE to multiply the tonnes of CO2E per PTE student to get the toones if CO2E from being a student
     return fp_of_studies
 
 
 #################################################
 
 if __name__ == '__main__':
+    import doctest
     doctest.testmod()
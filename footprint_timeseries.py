@@ -0,0 +1,194 @@
+# Part 19
+# Rolling annualized footprints from a stream of readings
+# Author: Yian Bian 260886212
+
+import datetime
+from array import array
+
+from unit_conversion import UNITS, DAYS_IN_YEAR
+from footprint_model import CATEGORY_NAMES
+
+TRAILING_MONTHS = 12
+
+
+#################################################
+
+def month_index(day):
+    '''(date or int) -> int
+    Return the number of the calendar month of day, a date or a proleptic
+    Gregorian ordinal (date.toordinal()), counted from year 0.
+
+    >>> month_index(datetime.date(2024, 3, 15)) - month_index(datetime.date(2023, 12, 31))
+    3
+    '''
+    if isinstance(day, int):
+        day = datetime.date.fromordinal(day)
+    return day.year * 12 + day.month - 1
+
+
+class RollingFootprint:
+    '''The footprint of one person in one category, from readings of the
+    amount emitted over a day, a week or a month. Readings are kept as one
+    sum per calendar month (with the number of days they cover), and the
+    all-time and trailing totals are updated in place, so adding a reading
+    takes constant time whatever the length of the history.
+
+    A footprint is annualized from the readings' average daily rate, so a
+    week without a reading lowers neither figure. The trailing window is the
+    months (TRAILING_MONTHS by default) up to that of the latest reading.
+
+    >>> f = RollingFootprint()
+    >>> start = datetime.date(2024, 1, 1).toordinal()
+    >>> for week in range(52):
+    ...     f.add(start + 7 * week, 20, 'week', 'kg')
+    >>> round(f.annual(), 4), round(f.trailing(), 4)
+    (1.0436, 1.0436)
+    >>> for week in range(52, 104): # halved the second year
+    ...     f.add(start + 7 * week, 10, 'week', 'kg')
+    >>> round(f.annual(), 4), round(f.trailing(), 4)
+    (0.7827, 0.5218)
+    >>> f.monthly()[-1][0], round(f.monthly()[-1][1], 4)
+    ((2025, 12), 0.04)
+    '''
+
+    __slots__ = ['months', 'first', 'last', 'sums', 'days',
+                 'total_sum', 'total_days', 'window_sum', 'window_days']
+
+    def __init__(self, months=TRAILING_MONTHS):
+        self.months = months
+        self.first = None
+        self.last = None
+        self.sums = array('d')
+        self.days = array('d')
+        self.total_sum = self.total_days = 0.0
+        self.window_sum = self.window_days = 0.0
+
+    def add(self, day, value, period='day', unit='t'):
+        '''(RollingFootprint, date or int, num, str, str) -> NoneType
+        Add a reading of value (in unit, CO2e) emitted over the period
+        ('day', 'week' or 'month') ending on day. Readings may come late,
+        but not before the first month tracked.'''
+        month = month_index(day)
+        amount = UNITS.convert(value, unit, 't')
+        days = UNITS.factor(period, 'day')
+        if self.first is None:
+            self.first = self.last = month
+        elif month < self.first:
+            raise ValueError('reading before the first month tracked')
+
+        i = month - self.first
+        if i >= len(self.sums):
+            grow = i + 1 - len(self.sums)
+            self.sums.extend([0.0] * grow)
+            self.days.extend([0.0] * grow)
+        self.sums[i] += amount
+        self.days[i] += days
+        self.total_sum += amount
+        self.total_days += days
+
+        if month > self.last:
+            self._advance(month)
+        if month > self.last - self.months:
+            self.window_sum += amount
+            self.window_days += days
+
+    def _advance(self, month):
+        '''(RollingFootprint, int) -> NoneType
+        Move the trailing window to end at month, dropping the months that
+        leave it (at most self.months of them).'''
+        old, self.last = self.last, month
+        if month - old >= self.months:
+            self.window_sum = self.window_days = 0.0
+            return
+        for m in range(max(old - self.months + 1, self.first), month - self.months + 1):
+            self.window_sum -= self.sums[m - self.first]
+            self.window_days -= self.days[m - self.first]
+
+    def annual(self):
+        '''(RollingFootprint) -> float
+        Return the annualized footprint (t CO2e) over all readings.'''
+        if not self.total_days:
+            return 0.0
+        return self.total_sum / self.total_days * DAYS_IN_YEAR
+
+    def trailing(self):
+        '''(RollingFootprint) -> float
+        Return the annualized footprint (t CO2e) over the trailing window.'''
+        if self.window_days <= 0:
+            return 0.0
+        return self.window_sum / self.window_days * DAYS_IN_YEAR
+
+    def monthly(self):
+        '''(RollingFootprint) -> list of ((int, int), float)
+        Return the (year, month) and amount emitted (t CO2e) of every
+        month tracked.'''
+        if self.first is None:
+            return []
+        months = []
+        for i, amount in enumerate(self.sums):
+            year, month = divmod(self.first + i, 12)
+            months.append(((year, month + 1), amount))
+        return months
+
+
+#################################################
+
+class FootprintTracker:
+    '''A RollingFootprint for every person and category, with the results
+    of a person in the shape of calculate_footprint_from_input.
+
+    >>> tracker = FootprintTracker()
+    >>> tracker.add('Alice', 'Utilities', datetime.date(2024, 1, 7), 20, 'week', 'kg')
+    >>> tracker.add('Alice', 'Diet', datetime.date(2024, 1, 31), 100, 'month', 'kg')
+    >>> [r if r == '' else round(r, 4) for r in tracker.annual('Alice')]
+    [1.0435, '', '', 1.2, '', '']
+    '''
+
+    def __init__(self, months=TRAILING_MONTHS):
+        self.months = months
+        self.footprints = {}
+
+    def add(self, person, category, day, value, period='day', unit='t'):
+        '''(FootprintTracker, str, str, date or int, num, str, str) -> NoneType
+        Add a reading for person in category (one of CATEGORY_NAMES), see
+        RollingFootprint.add.'''
+        if category not in CATEGORY_NAMES:
+            raise ValueError('unknown category ' + category)
+        key = (person, category)
+        footprint = self.footprints.get(key)
+        if footprint is None:
+            footprint = self.footprints[key] = RollingFootprint(self.months)
+        footprint.add(day, value, period, unit)
+
+    def _results(self, person, method):
+        '''(FootprintTracker, str, function) -> lst
+        Return method applied to the RollingFootprint of person in every
+        category, '' for a category without readings.'''
+        results = []
+        for category in CATEGORY_NAMES:
+            footprint = self.footprints.get((person, category))
+            results.append('' if footprint is None else method(footprint))
+        return results
+
+    def annual(self, person):
+        '''(FootprintTracker, str) -> lst
+        Return the annualized footprint of person in every category over
+        all readings, '' for a category without readings.'''
+        return self._results(person, RollingFootprint.annual)
+
+    def trailing(self, person):
+        '''(FootprintTracker, str) -> lst
+        Same as annual, over the trailing window.'''
+        return self._results(person, RollingFootprint.trailing)
+
+    def people(self):
+        '''(FootprintTracker) -> list of str
+        Return everyone with a reading, in order of their first reading.'''
+        return list(dict.fromkeys(person for person, category in self.footprints))
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -2,19 +2,19 @@
 # Footprint of local transportation and travel
 # Author: Yian Bian 260886212
 
-import doctest
 from unit_conversion import *
+import footprint_factors as factors
 
 
 ################################################
-days_in_year = 365.2425
-pound_in_kg = 0.45359237
-kg_in_ton = 0.001
-kwh_in_mwh = 0.001
-km_in_miles = 0.621371
-g_in_kg = 0.001
-
-def fp_from_driving(annual_km_driven):
+days_in_year = UNITS.factor('year', 'day')
+pound_in_kg = UNITS.factor('lb', 'kg')
+kg_in_ton = UNITS.factor('kg', 't')
+kwh_in_mwh = UNITS.factor('kWh', 'MWh')
+km_in_miles = UNITS.factor('km', 'mile')
+g_in_kg = UNITS.factor('g', 'kg')
+
+def fp_from_driving(annual_km_driven, *, table=None):
     '''
     (num) -> flt
     Approximate CO2E footprint for one year of driving, based on total km driven.
@@ -29,14 +29,15 @@ def fp_from_driving(annual_km_driven):
     >>> round(fp_from_driving(1234), 4)
     0.2748
     '''
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
     annual_mile_driven = annual_km_driven * km_in_miles # covert km to miles
-    annual_pound = annual_mile_driven * 0.79 # use the total miles driven to calculate the pounds of CO2E that produced
+    annual_pound = annual_mile_driven * table['driving_lb_per_mile'] # use the total miles driven to calculate the pounds of CO2E that produced
     annual_kg = annual_pound * pound_in_kg # covert pound to kg
     fp_from_driving = annual_kg * kg_in_ton # covert kg to ton
     return fp_from_driving 
 
 
-def fp_from_taxi_uber(weekly_uber_rides):
+def fp_from_taxi_uber(weekly_uber_rides, *, table=None):
     '''(num) -> flt
     Estimate in metric tonnes of CO2E the annual footprint from a given
     number of weekly uber/taxi/etc rides.
@@ -51,14 +52,15 @@ def fp_from_taxi_uber(weekly_uber_rides):
     >>> round(fp_from_taxi_uber(25), 4)
     1.6104
     '''
-    number_of_million_trip = weekly_uber_rides / 81000000 # to calculate the number of 81 million trips
-    weekly_ton = number_of_million_trip * 100000 # because 81 million trips will produce 100,000 tonnes of CO2E, use the nunber of 81 million trips to multiply 100,000 to get the weekly CO2E footprint
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
+    number_of_million_trip = weekly_uber_rides / table['ride_hailing_trips'] # to calculate the number of 81 million trips
+    weekly_ton = number_of_million_trip * table['ride_hailing_t'] # because 81 million trips will produce 100,000 tonnes of CO2E, use the nunber of 81 million trips to multiply 100,000 to get the weekly CO2E footprint
     daily_ton = weekly_ton / 7 # use the weekly footprint divided the number of days in a week to get the daily footprint
     fp_from_taxi_uber = daily_ton * days_in_year #use the daily footprint to multiply the number of days in a year to get the annual footprint
     return fp_from_taxi_uber
 
 
-def fp_from_transit(weekly_bus_trips, weekly_rail_trips):
+def fp_from_transit(weekly_bus_trips, weekly_rail_trips, *, table=None):
     '''
     (num, num) -> flt
     Annual CO2E tonnes from public transit based on number of weekly bus
@@ -82,14 +84,15 @@ def fp_from_transit(weekly_bus_trips, weekly_rail_trips):
     >>> round(fp_from_transit(10, 2), 4)
     0.4544
     '''
-    weekly_bus_km = weekly_bus_trips * 7.7 # The average transit trip in Montr´eal is 7.7 km.We use the average transit trip to multiply the number of weekly bus rides to get the weekly transit trip in a week.
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
+    weekly_bus_km = weekly_bus_trips * table['transit_trip_km'] # The average transit trip in Montr´eal is 7.7 km.We use the average transit trip to multiply the number of weekly bus rides to get the weekly transit trip in a week.
     weekly_bus_mile = weekly_bus_km * km_in_miles # covert km to miles
-    weekly_bus_g = weekly_bus_mile * 150 # a mile by bus will produce 150g CO2E.We use the transit trip(in miles) in a week tp multiply 150 to get the CO2E produced in a week(in gram)
+    weekly_bus_g = weekly_bus_mile * table['bus_g_per_mile'] # a mile by bus will produce 150g CO2E.We use the transit trip(in miles) in a week tp multiply 150 to get the CO2E produced in a week(in gram)
     weekly_bus_kg = weekly_bus_g * g_in_kg # covert gram to kilogram
     weekly_bus_ton = weekly_bus_kg * kg_in_ton #covert kilogram to ton
-    weekly_rail_km = weekly_rail_trips * 7.7 # The average transit trip in Montr´eal is 7.7 km.We use the average transit trip to multiply the number of weekly rail rides to get the weekly transit trip in a week.
+    weekly_rail_km = weekly_rail_trips * table['transit_trip_km'] # The average transit trip in Montr´eal is 7.7 km.We use the average transit trip to multiply the number of weekly rail rides to get the weekly transit trip in a week.
     weekly_rail_mile = weekly_rail_km * km_in_miles # covert km ton miles
-    weekly_rail_g = weekly_rail_mile * 160 # a mile by rail will produce 160g CO2E.We use the transit trip(in miles) in a week tp multiply 150 to get the CO2E produced in a week(in gram)
+    weekly_rail_g = weekly_rail_mile * table['rail_g_per_mile'] # a mile by rail will produce 160g CO2E.We use the transit trip(in miles) in a week tp multiply 150 to get the CO2E produced in a week(in gram)
     weekly_rail_kg = weekly_rail_g * g_in_kg #convert gram to kilogram
     weekly_rail_ton = weekly_rail_kg * kg_in_ton # convert kilogram to tonnes
     weekly_both = weekly_rail_ton + weekly_bus_ton # calculate the whole CO2E produced by rail and bus in a week
@@ -98,7 +101,7 @@ def fp_from_transit(weekly_bus_trips, weekly_rail_trips):
     return fp_from_transit
 
 
-def fp_of_transportation(weekly_bus_rides, weekly_rail_rides, weekly_uber_rides, weekly_km_driven):
+def fp_of_transportation(weekly_bus_rides, weekly_rail_rides, weekly_uber_rides, weekly_km_driven, *, table=None):
     '''(num, num, num, num) -> flt
     Estimate in tonnes of CO2E the footprint of weekly transportation given
     specified annual footprint in tonnes of CO2E from diet.
@@ -110,23 +113,24 @@ def fp_of_transportation(weekly_bus_rides, weekly_rail_rides, weekly_uber_rides,
     >>> round(fp_of_transportation(1, 2, 3, 4), 4)
     0.3571
     '''
-    weekly_bus_km = weekly_bus_rides * 7.7 # The average transit trip in Montr´eal is 7.7 km.We use the average transit trip to multiply the number of weekly bus rides to get the weekly transit trip in a week.
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
+    weekly_bus_km = weekly_bus_rides * table['transit_trip_km'] # The average transit trip in Montr´eal is 7.7 km.We use the average transit trip to multiply the number of weekly bus rides to get the weekly transit trip in a week.
     weekly_bus_mile = weekly_bus_km * km_in_miles # covert km to miles
-    weekly_bus_g = weekly_bus_mile * 150 # a mile by bus will produce 150g CO2E.We use the transit trip(in miles) in a week tp multiply 150 to get the CO2E produced in a week(in gram)
+    weekly_bus_g = weekly_bus_mile * table['bus_g_per_mile'] # a mile by bus will produce 150g CO2E.We use the transit trip(in miles) in a week tp multiply 150 to get the CO2E produced in a week(in gram)
     weekly_bus_kg = weekly_bus_g * g_in_kg # covert gram to kilogram
     weekly_bus_ton = weekly_bus_kg * kg_in_ton #covert kilogram to ton
-    weekly_rail_km = weekly_rail_rides * 7.7 # The average transit trip in Montr´eal is 7.7 km.We use the average transit trip to multiply the number of weekly rail rides to get the weekly transit trip in a week.
+    weekly_rail_km = weekly_rail_rides * table['transit_trip_km'] # The average transit trip in Montr´eal is 7.7 km.We use the average transit trip to multiply the number of weekly rail rides to get the weekly transit trip in a week.
     weekly_rail_mile = weekly_rail_km * km_in_miles # covert km ton miles
-    weekly_rail_g = weekly_rail_mile * 160 # a mile by rail will produce 160g CO2E.We use the transit trip(in miles) in a week tp multiply 150 to get the CO2E produced in a week(in gram)
+    weekly_rail_g = weekly_rail_mile * table['rail_g_per_mile'] # a mile by rail will produce 160g CO2E.We use the transit trip(in miles) in a week tp multiply 150 to get the CO2E produced in a week(in gram)
     weekly_rail_kg = weekly_rail_g * g_in_kg #convert gram to kilogram
     weekly_rail_ton = weekly_rail_kg * kg_in_ton # convert kilogram to tonnes
     weekly_both = weekly_rail_ton + weekly_bus_ton # calculate the whole CO2E produced by rail and bus in a week
     weekly_mile_driven = weekly_km_driven * km_in_miles # covert km to miles
-    weekly_pound = weekly_mile_driven * 0.79 # use the total miles driven to calculate the pounds of CO2E that produced
+    weekly_pound = weekly_mile_driven * table['driving_lb_per_mile'] # use the total miles driven to calculate the pounds of CO2E that produced
     weekly_kg = weekly_pound * pound_in_kg # covert pound to kg
     weekly_ton = weekly_kg * kg_in_ton # covert kg to ton
-    number_of_million_trip = weekly_uber_rides / 81000000 # to calculate the number of 81 million trips
-    weekly_uber_ton = number_of_million_trip * 100000 # because 81 million trips will produce 100,000 tonnes of CO2E, use the nunber of 81 million trips to multiply 100,000 to get the weekly CO2E footprint
+    number_of_million_trip = weekly_uber_rides / table['ride_hailing_trips'] # to calculate the number of 81 million trips
+    weekly_uber_ton = number_of_million_trip * table['ride_hailing_t'] # because 81 million trips will produce 100,000 tonnes of CO2E, use the nunber of 81 million trips to multiply 100,000 to get the weekly CO2E footprint
     whole_weekly_ton = weekly_bus_ton + weekly_rail_ton + weekly_ton + weekly_uber_ton #sum up all the weekly produced CO2E to get the whole weekly produced footprint
     daily_ton = whole_weekly_ton / 7 #use the weekly footprint to divide the number of days in a week to get the daily footprint
     fp_of_transportation = daily_ton * days_in_year #use the daily CO2E to multiply the days in a year to get the annual footprint in tonnes of CO2E
@@ -135,7 +139,7 @@ def fp_of_transportation(weekly_bus_rides, weekly_rail_rides, weekly_uber_rides,
 
 #################################################
 
-def fp_of_travel(annual_long_flights, annual_short_flights, annual_train, annual_coach, annual_hotels):
+def fp_of_travel(annual_long_flights, annual_short_flights, annual_train, annual_coach, annual_hotels, *, table=None):
     '''(num, num, num, num, num) -> float
     Approximate CO2E footprint in metric tonnes for annual travel, based on number of long flights (>4 h), short flights (<4), intercity train rides, intercity coach bus rides, and spending at hotels.
 
@@ -173,17 +177,18 @@ def fp_of_travel(annual_long_flights, annual_short_flights, annual_train, annual
     >>> round(fp_of_travel(1, 2, 3, 4, 5), 4) # together
     3.2304
     '''
-    annual_long_flight_lbs = annual_long_flights * 4400 #use the number of long filghts multiply the lbs of CO2E that a single long flight produced to get the total lbs that the long flight produced
+    table = (factors.ACTIVE if table is None else table).factors # the emission factors in use
+    annual_long_flight_lbs = annual_long_flights * table['long_flight_lb'] #use the number of long filghts multiply the lbs of CO2E that a single long flight produced to get the total lbs that the long flight produced
     annual_long_flight_kg = annual_long_flight_lbs * pound_in_kg #convert pound to kg
     long_flight_ton = annual_long_flight_kg * kg_in_ton #convert kg to ton
-    annual_short_flight_lbs = annual_short_flights * 1100 #use the number of short filghts multiply the lbs of CO2E that a single short flight produced to get the total lbs that the short flight produced
+    annual_short_flight_lbs = annual_short_flights * table['short_flight_lb'] #use the number of short filghts multiply the lbs of CO2E that a single short flight produced to get the total lbs that the short flight produced
     annual_short_flight_kg = annual_short_flight_lbs * pound_in_kg #convert pound to kg
     short_flight_ton = annual_short_flight_kg * kg_in_ton #convert kg to ton
-    annual_train_kg = annual_train * 34.45 # use the number of trains multiply the kg of CO2E that a train produced to get the total kg that the train porduced
+    annual_train_kg = annual_train * table['train_kg'] # use the number of trains multiply the kg of CO2E that a train produced to get the total kg that the train porduced
     train_ton = annual_train_kg * kg_in_ton #convert kg to ton
-    annual_coach_kg = annual_coach * 33 # use the number of trains multiply the kg of CO2E that a train produced to get the total kg that the train porduced
+    annual_coach_kg = annual_coach * table['coach_kg'] # use the number of trains multiply the kg of CO2E that a train produced to get the total kg that the train porduced
     coach_ton = annual_coach_kg * kg_in_ton #convert kg to ton
-    annual_hotel_g = annual_hotels * 270 # use the bill of hotel multiply the g of CO2E that produced by every dollar to get the total g
+    annual_hotel_g = annual_hotels * table['hotel_g_per_dollar'] # use the bill of hotel multiply the g of CO2E that produced by every dollar to get the total g
     hotel_kg = annual_hotel_g * g_in_kg #convert g to kg
     hotel_ton = hotel_kg * kg_in_ton # convert kg to ton
     fp_of_travel = long_flight_ton + short_flight_ton + train_ton + coach_ton + hotel_ton # sum up all the CO2E footprint to get the total
@@ -192,4 +197,5 @@ def fp_of_travel(annual_long_flights, annual_short_flights, annual_train, annual
 #################################################
 
 if __name__ == '__main__':
+    import doctest
     doctest.testmod()
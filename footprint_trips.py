@@ -0,0 +1,216 @@
+# Part 22
+# Transportation footprints from raw trip logs
+# Author: Yian Bian 260886212
+
+import csv
+
+from unit_conversion import UNITS, DAYS_IN_YEAR
+import footprint_factors as factors
+from footprint_hydro import parse_time
+
+CHUNK_TRIPS = 1 << 16
+SECONDS_IN_DAY = 24 * 60 * 60
+
+# the names trip logs use for each mode. 'rail' is urban rail, scored per
+# mile like fp_of_transportation's transit; an intercity train is a trip of
+# fp_of_travel, scored per ride, so 'train' is deliberately not a mode here.
+MODE_ALIASES = {
+    'bus': 'bus',
+    'rail': 'rail', 'metro': 'rail', 'subway': 'rail',
+    'car': 'car', 'drive': 'car', 'driving': 'car',
+    'taxi': 'ride_hailing', 'uber': 'ride_hailing', 'ride_hailing': 'ride_hailing',
+    'walk': 'walk', 'bike': 'walk',
+}
+
+
+#################################################
+
+def mode_factors(table=None):
+    '''(FactorTable) -> dict of str: (float, float)
+    Return the tonnes of CO2E per km and per trip of every mode under the
+    emission factors of table (the ACTIVE one by default), from the same
+    factors fp_of_transportation uses: bus and rail per mile, driving in
+    lbs per mile, ride hailing per trip whatever its length.
+
+    >>> factors_now = mode_factors()
+    >>> round(factors_now['bus'][0] * 1e6, 2), factors_now['walk']
+    (93.21, (0.0, 0.0))
+    '''
+    if table is None:
+        table = factors.ACTIVE
+    per_mile = UNITS.factor('1/mile', '1/km')
+    return {
+        'bus': (table['bus_g_per_mile'] * per_mile * UNITS.factor('g', 't'), 0.0),
+        'rail': (table['rail_g_per_mile'] * per_mile * UNITS.factor('g', 't'), 0.0),
+        'car': (table['driving_lb_per_mile'] * per_mile * UNITS.factor('lb', 't'), 0.0),
+        'ride_hailing': (0.0, table['ride_hailing_t'] / table['ride_hailing_trips']),
+        'walk': (0.0, 0.0),
+    }
+
+
+def read_trips_csv(f, chunk_trips=CHUNK_TRIPS):
+    '''(file, int) -> iterator of (list, list, list, list)
+    Yield the trips in the open CSV file f (person, mode, distance in km,
+    time as read by parse_time, with an optional header row) as columns of
+    at most chunk_trips rows.
+
+    >>> import io
+    >>> data = io.StringIO('person,mode,km,time\\nAlice,bus,7.7,0\\nBob,car,12,3600\\n')
+    >>> list(read_trips_csv(data))
+    [(['Alice', 'Bob'], ['bus', 'car'], [7.7, 12.0], [0, 3600])]
+    >>> list(read_trips_csv(io.StringIO('Alice,bus,7.7,0\\nBob,car,12\\n')))
+    Traceback (most recent call last):
+    ValueError: line 2: expected person,mode,km,time
+    '''
+    people, modes, distances, times = [], [], [], []
+    for n, row in enumerate(csv.reader(f)):
+        if not row:
+            continue
+        if len(row) < 4:
+            raise ValueError('line ' + str(n + 1) + ': expected person,mode,km,time')
+        try:
+            km = float(row[2])
+        except ValueError:
+            if n == 0:
+                continue
+            raise ValueError('line ' + str(n + 1) + ': distance ' + repr(row[2]) + ' is not a number')
+        try:
+            t = parse_time(row[3])
+        except ValueError:
+            raise ValueError('line ' + str(n + 1) + ': time ' + repr(row[3]) + ' is not a time')
+        people.append(row[0])
+        modes.append(row[1])
+        distances.append(km)
+        times.append(t)
+        if len(people) >= chunk_trips:
+            yield people, modes, distances, times
+            people, modes, distances, times = [], [], [], []
+    if people:
+        yield people, modes, distances, times
+
+
+#################################################
+
+class TripTotals:
+    '''The emissions (t CO2E), number of trips and km of every person, and
+    the first and last time of any trip, added a chunk of trips at a time.
+    Memory grows with the number of people, not of trips, and totals of
+    separate shards of a log merge into the totals of all of it.
+
+    A footprint is annualized over the period the whole log covers, so a
+    person who travels once in a month of trips is scored for that month.
+
+    >>> totals = TripTotals()
+    >>> totals.add_many(['Alice', 'Alice', 'Bob'], ['bus', 'uber', 'bike'], [7.7, 5, 3], [0, 3600, 7 * 86400])
+    >>> totals.trips['Alice'], totals.km['Alice'], totals.days()
+    (2, 12.7, 7.0)
+    >>> round(totals.annual('Alice'), 4), totals.annual('Bob')
+    (0.1019, 0.0)
+    '''
+
+    def __init__(self, table=None):
+        self.factors = mode_factors(table)
+        self.emissions = {}
+        self.trips = {}
+        self.km = {}
+        self.first = None
+        self.last = None
+
+    def _add_totals(self, person, emissions, trips, km):
+        '''(TripTotals, str, float, int, float) -> NoneType
+        Add emissions (t CO2E), trips and km to the totals of person.'''
+        if person in self.trips:
+            self.emissions[person] += emissions
+            self.trips[person] += trips
+            self.km[person] += km
+        else:
+            self.emissions[person] = emissions
+            self.trips[person] = trips
+            self.km[person] = km
+
+    def add_many(self, people, modes, distances, times):
+        '''(TripTotals, seq, seq of str, seq of float, seq of int) -> NoneType
+        Add a chunk of trips, one person, mode, km and time per row. The
+        trips are grouped by person before they reach the totals.'''
+        mode_factors = self.factors
+        grouped = {}
+        for person, mode, km in zip(people, modes, distances):
+            name = MODE_ALIASES.get(mode.strip().lower())
+            if name is None:
+                raise ValueError('unknown mode ' + repr(mode))
+            per_km, per_trip = mode_factors[name]
+            total = grouped.get(person)
+            if total is None:
+                total = grouped[person] = [0.0, 0, 0.0]
+            total[0] += km * per_km + per_trip
+            total[1] += 1
+            total[2] += km
+        for person, (emissions, trips, km) in grouped.items():
+            self._add_totals(person, emissions, trips, km)
+        if len(times):
+            self._cover(min(times), max(times))
+
+    def _cover(self, first, last):
+        '''(TripTotals, int, int) -> NoneType
+        Widen the period the trips cover to include first to last.'''
+        if self.first is None or first < self.first:
+            self.first = first
+        if self.last is None or last > self.last:
+            self.last = last
+
+    def merge(self, other):
+        '''(TripTotals, TripTotals) -> TripTotals
+        Add the totals of other to these and return self.'''
+        for person in other.trips:
+            self._add_totals(person, other.emissions[person], other.trips[person], other.km[person])
+        if other.first is not None:
+            self._cover(other.first, other.last)
+        return self
+
+    def days(self):
+        '''(TripTotals) -> float
+        Return the number of days the trips cover, at least one.'''
+        if self.first is None:
+            return 1.0
+        return max(1.0, (self.last - self.first) / SECONDS_IN_DAY)
+
+    def annual(self, person, days=None):
+        '''(TripTotals, str, num) -> float
+        Return the annual transportation footprint of person in tonnes of
+        CO2E, from their trips over days (by default the days the log
+        covers).'''
+        if days is None:
+            days = self.days()
+        return self.emissions.get(person, 0.0) / days * DAYS_IN_YEAR
+
+    def annual_all(self, days=None):
+        '''(TripTotals, num) -> dict
+        Return the annual transportation footprint of every person.'''
+        if days is None:
+            days = self.days()
+        return {person: self.annual(person, days) for person in self.trips}
+
+
+def aggregate_trips(chunks, totals=None):
+    '''(iterable of (seq, seq, seq, seq), TripTotals) -> TripTotals
+    Add every chunk of trips (from read_trips_csv) to totals (new ones, under
+    the emission factors in use, by default) and return them.'''
+    if totals is None:
+        totals = TripTotals()
+    for people, modes, distances, times in chunks:
+        totals.add_many(people, modes, distances, times)
+    return totals
+
+
+def aggregate_trip_file(fname, totals=None):
+    '''(str, TripTotals) -> TripTotals
+    Same as aggregate_trips, for the CSV trip log with name fname.'''
+    with open(fname, 'r', newline='') as f:
+        return aggregate_trips(read_trips_csv(f), totals)
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
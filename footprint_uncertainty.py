@@ -0,0 +1,363 @@
+# Part 26
+# Monte Carlo uncertainty of footprints from uncertain emission factors
+# Author: Yian Bian 260886212
+
+import math
+import multiprocessing
+import random
+from array import array
+
+import footprint_factors as factors
+from footprint_model import MODEL, fold
+from footprint_aggregate import COLUMNS
+from footprint_scenario import get_column, population_size
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, fall back to plain lists
+    np = None
+
+SAMPLES = 1000
+SEED = 260886212
+LEVEL = 0.95
+# at most this many sampled results are held per chunk of people
+MAX_CHUNK_VALUES = 1 << 22
+
+# The spread of every factor around its value in the table, as a
+# multiplier: ('lognormal', geometric standard deviation), ('uniform',
+# low, high) or ('triangular', low, mode, high), or ('fixed',). The diet
+# and computing factors are rough point estimates, so they get the widest
+# spread; these are planning assumptions until the sources give ranges.
+DISTRIBUTIONS = dict((name, ('lognormal', 1.2)) for name in factors.DEFAULT_FACTORS)
+DISTRIBUTIONS.update((name, ('lognormal', 1.4)) for name in
+                     ['vegan_kg_per_day', 'meat_g_per_g', 'cheese_g_per_g', 'milk_g_per_l', 'egg_g'])
+DISTRIBUTIONS.update((name, ('lognormal', 1.5)) for name in
+                     ['online_g_per_hour', 'phone_kg_per_daily_hour', 'light_device_kg',
+                      'medium_device_kg', 'heavy_device_kg'])
+DISTRIBUTIONS['ride_hailing_trips'] = ('fixed',)
+
+
+#################################################
+
+def sample_multipliers(distribution, samples, rng):
+    '''(tuple, int, Random or Generator) -> seq of float
+    Return samples draws of the multiplier distribution (see
+    DISTRIBUTIONS) from rng, a numpy Generator when numpy is available,
+    otherwise a random.Random.
+
+    >>> sample_multipliers(('fixed',), 3, random.Random(1))
+    [1.0, 1.0, 1.0]
+    '''
+    kind, params = distribution[0], distribution[1:]
+    if kind == 'fixed':
+        return [1.0] * samples
+    if np is not None and not isinstance(rng, random.Random):
+        if kind == 'lognormal':
+            return rng.lognormal(0.0, math.log(params[0]), samples)
+        if kind == 'uniform':
+            return rng.uniform(params[0], params[1], samples)
+        if kind == 'triangular':
+            return rng.triangular(params[0], params[1], params[2], samples)
+    else:
+        if kind == 'lognormal':
+            return [rng.lognormvariate(0.0, math.log(params[0])) for i in range(samples)]
+        if kind == 'uniform':
+            return [rng.uniform(params[0], params[1]) for i in range(samples)]
+        if kind == 'triangular':
+            return [rng.triangular(params[0], params[2], params[1]) for i in range(samples)]
+    raise ValueError('unknown distribution ' + kind)
+
+
+def _fold_all(model, table):
+    '''(FootprintModel, FactorTable) -> list of float
+    Return the coefficients of every input of model followed by the
+    intercept of every category, folded under table.'''
+    folded = [fold(fun, table) for fun in model.functions]
+    return [w for coefficients, b in folded for w in coefficients] + [b for coefficients, b in folded]
+
+
+def factor_exponents(model=MODEL, base=None):
+    '''(FootprintModel, FactorTable) -> (list of float, list of list of (str, int))
+    Return the coefficients and intercepts of model under base (see
+    _fold_all) and, for each of them, the power every factor it depends on
+    is raised to: each is a product of factors and unit constants (a
+    ride-hailing trip is ride_hailing_t / ride_hailing_trips), found by
+    folding with every factor doubled and checked with it tripled.
+
+    >>> values, exponents = factor_exponents()
+    >>> exponents[MODEL.inputs.index('weekly_uber_rides')]
+    [('ride_hailing_t', 1), ('ride_hailing_trips', -1)]
+    '''
+    if base is None:
+        base = factors.ACTIVE
+    values = _fold_all(model, base)
+    exponents = [[] for value in values]
+    for name in factors.DEFAULT_FACTORS:
+        doubled = _fold_all(model, factors.FactorTable(base.version, {name: base[name] * 2}, base))
+        tripled = _fold_all(model, factors.FactorTable(base.version, {name: base[name] * 3}, base))
+        for j, (value, two, three) in enumerate(zip(values, doubled, tripled)):
+            if value == two == three:
+                continue
+            power = round(math.log2(two / value)) if value and two else None
+            if power is None or not math.isclose(three, value * 3 ** power, rel_tol=1e-9):
+                raise ValueError('a coefficient of the model is not a power of ' + name)
+            exponents[j].append((name, power))
+    return values, exponents
+
+
+def sample_models(samples=SAMPLES, distributions=None, seed=SEED, base=None, model=MODEL):
+    '''(int, dict, int, FactorTable, FootprintModel) -> (seq, seq)
+    Draw samples factor tables around base (the ACTIVE table by default)
+    and return, for model, one row of coefficients (one per input) per
+    sample and one row of intercepts (one per category) per sample.
+
+    The model is only folded once per factor (see factor_exponents): every
+    sample is the base coefficients scaled by its multipliers raised to
+    their powers, computed for all samples at once. No table is made
+    ACTIVE, so the factors the rest of the process sees never change.
+
+    >>> coefficients, intercepts = sample_models(200, seed=1)
+    >>> len(coefficients), len(coefficients[0]), len(intercepts[0])
+    (200, 21, 6)
+    >>> coefficients, intercepts = sample_models(3, {}, seed=1) # no uncertainty
+    >>> [float(b) for b in intercepts[0]] == MODEL.intercepts
+    True
+    '''
+    if distributions is None:
+        distributions = DISTRIBUTIONS
+    if base is None:
+        base = factors.ACTIVE
+    rng = np.random.default_rng(seed) if np is not None else random.Random(seed)
+    draws = {name: sample_multipliers(distributions.get(name, ('fixed',)), samples, rng)
+             for name in factors.DEFAULT_FACTORS}
+    values, exponents = factor_exponents(model, base)
+    n = len(model.inputs)
+
+    if np is not None:
+        draws = {name: np.asarray(draw, dtype=float) for name, draw in draws.items()}
+        sampled = np.empty((samples, len(values)))
+        for j, (value, powers) in enumerate(zip(values, exponents)):
+            column = np.full(samples, float(value))
+            for name, power in powers:
+                column *= draws[name] ** power
+            sampled[:, j] = column
+        return sampled[:, :n], sampled[:, n:]
+
+    sampled = []
+    for s in range(samples):
+        row = list(values)
+        for j, powers in enumerate(exponents):
+            for name, power in powers:
+                row[j] *= draws[name][s] ** power
+        sampled.append(row)
+    return [row[:n] for row in sampled], [row[n:] for row in sampled]
+
+
+def _quantile(values, q):
+    '''(sorted list of float, float) -> float
+    Return the q quantile of values, interpolating linearly.
+
+    >>> _quantile([1.0, 2.0, 3.0, 4.0], 0.5)
+    2.5
+    '''
+    position = q * (len(values) - 1)
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+#################################################
+
+# the sampled models of this process, set by _start before any chunk runs
+_STATE = {}
+
+
+def _start(slices, coefficients, intercepts, level):
+    '''(list of (int, int), seq, seq, float) -> NoneType
+    Set the sampled models the chunks of this process are scored with.'''
+    _STATE.update(slices=slices, coefficients=coefficients, intercepts=intercepts, level=level)
+
+
+def _interval_chunk(columns):
+    '''(list of seq) -> list of (seq, seq, seq)
+    Return the mean, low and high bound of every category and the total
+    for a chunk of people, given one column per input.'''
+    slices, coefficients, intercepts = _STATE['slices'], _STATE['coefficients'], _STATE['intercepts']
+    tail = (1 - _STATE['level']) / 2
+    if np is not None:
+        x = np.column_stack([np.asarray(column, dtype=float) for column in columns])
+        total = np.zeros((len(x), len(intercepts)))
+        out = []
+        for c, (start, end) in enumerate(slices):
+            results = x[:, start:end] @ coefficients[:, start:end].T + intercepts[:, c]
+            total += np.nan_to_num(results)
+            out.append(results)
+        out.append(total)
+        summaries = []
+        for results in out:
+            low, high = np.percentile(results, [100 * tail, 100 * (1 - tail)], axis=1)
+            summaries.append((results.mean(axis=1), low, high))
+        return summaries
+
+    n = len(columns[0]) if columns else 0
+    summaries = [(array('d'), array('d'), array('d')) for name in range(len(slices) + 1)]
+    for p in range(n):
+        row = [column[p] for column in columns]
+        total = [0.0] * len(intercepts)
+        for c, (start, end) in enumerate(slices):
+            x = row[start:end]
+            mean, low, high = summaries[c]
+            if any(v != v for v in x):
+                mean.append(math.nan); low.append(math.nan); high.append(math.nan)
+                continue
+            results = [b[c] + sum(w * v for w, v in zip(ws[start:end], x))
+                       for ws, b in zip(coefficients, intercepts)]
+            for s, value in enumerate(results):
+                total[s] += value
+            results.sort()
+            mean.append(math.fsum(results) / len(results))
+            low.append(_quantile(results, tail))
+            high.append(_quantile(results, 1 - tail))
+        mean, low, high = summaries[-1]
+        mean.append(math.fsum(total) / len(total))
+        total.sort()
+        low.append(_quantile(total, tail))
+        high.append(_quantile(total, 1 - tail))
+    return summaries
+
+
+def footprint_intervals(population, samples=SAMPLES, distributions=None, seed=SEED, level=LEVEL,
+                        processes=1, chunk_people=None, base=None):
+    '''(object, int, dict, int, float, int, int, FactorTable) -> dict
+    Return, for every category and the total, the mean and the bounds of
+    the central level interval (95% by default) of the footprint of every
+    person of population (a ColumnarPopulation, a footprint_records
+    Population or a dict of input columns), as {'mean', 'low', 'high'}
+    columns, nan for a section left empty.
+
+    The factors are sampled once; people are then scored under every
+    sample chunk_people at a time (by default as many as keep a chunk
+    within MAX_CHUNK_VALUES results), over processes worker processes.
+
+    >>> population = {name: [0.0] for name in MODEL.inputs}
+    >>> population['daily_g_meat'] = [100.0]
+    >>> population['annual_long_flights'] = [float('nan')]
+    >>> intervals = footprint_intervals(population, samples=500, seed=7)
+    >>> diet = intervals['Diet']
+    >>> bool(diet['low'][0] < diet['mean'][0] < diet['high'][0]), math.isnan(intervals['Travel']['mean'][0])
+    (True, True)
+    '''
+    model = MODEL
+    coefficients, intercepts = sample_models(samples, distributions, seed, base, model)
+    n = population_size(population)
+    if chunk_people is None:
+        chunk_people = max(1, MAX_CHUNK_VALUES // (samples * (len(model.slices) + 1)))
+    chunks = ([_slice(get_column(population, name), start, min(n, start + chunk_people))
+               for name in model.inputs] for start in range(0, n, chunk_people))
+
+    columns = [[[], [], []] for name in COLUMNS]
+    state = (model.slices, coefficients, intercepts, level)
+    if processes == 1:
+        _start(*state)
+        summaries = map(_interval_chunk, chunks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, _start, state)
+        summaries = pool.imap(_interval_chunk, chunks)
+    try:
+        for summary in summaries:
+            for column, parts in zip(columns, summary):
+                for collected, part in zip(column, parts):
+                    collected.append(part)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    result = {}
+    for name, (mean, low, high) in zip(COLUMNS, columns):
+        if np is not None:
+            empty = np.zeros(0)
+            result[name] = {'mean': np.concatenate(mean or [empty]), 'low': np.concatenate(low or [empty]),
+                            'high': np.concatenate(high or [empty])}
+        else:
+            result[name] = {'mean': [x for part in mean for x in part], 'low': [x for part in low for x in part],
+                            'high': [x for part in high for x in part]}
+    return result
+
+
+def _slice(column, start, end):
+    '''(seq, int, int) -> seq
+    Return rows start to end of column as something that can be sent
+    to a worker process.'''
+    part = column[start:end]
+    if isinstance(part, memoryview):
+        return array('d', part)
+    return part
+
+
+def population_interval(population, samples=SAMPLES, distributions=None, seed=SEED, level=LEVEL, base=None):
+    '''(object, int, dict, int, float, FactorTable) -> dict
+    Return, for every category and the total, the mean and the bounds of
+    the central level interval of the summed footprint of the whole
+    population. The model is linear, so every sample only needs the sum of
+    each input over the population: one pass over the data, however many
+    samples.
+
+    >>> population = {name: [1.0, 2.0] for name in MODEL.inputs}
+    >>> interval = population_interval(population, samples=500, seed=7)['Total']
+    >>> interval['low'] < interval['mean'] < interval['high']
+    True
+
+    A person with a section left partly empty is left out of that section.
+
+    >>> partial = {name: [1.0, 2.0, math.nan] for name in MODEL.inputs}
+    >>> partial['daily_hydro'][2] = 5.0
+    >>> population_interval(partial, samples=500, seed=7)['Total'] == interval
+    True
+    '''
+    model = MODEL
+    coefficients, intercepts = sample_models(samples, distributions, seed, base, model)
+    sums = []
+    counts = []
+    for start, end in model.slices:
+        columns = [get_column(population, name) for name in model.inputs[start:end]]
+        if np is not None:
+            x = np.column_stack([np.asarray(column, dtype=float) for column in columns])
+            empty = np.isnan(x).any(axis=1)
+            x[empty] = np.nan # a section left partly empty counts as empty
+            sums.extend(np.nansum(x, axis=0).tolist())
+            counts.append(len(x) - int(empty.sum()))
+            continue
+        total = [0.0] * (end - start)
+        count = 0
+        for row in zip(*columns):
+            if all(v == v for v in row):
+                count += 1
+                for k, v in enumerate(row):
+                    total[k] += v
+        sums.extend(total)
+        counts.append(count)
+
+    tail = (1 - level) / 2
+    per_sample = []
+    for ws, bs in zip(coefficients, intercepts):
+        values = []
+        for c, (start, end) in enumerate(model.slices):
+            values.append(counts[c] * bs[c] + math.fsum(w * x for w, x in zip(ws[start:end], sums[start:end])))
+        values.append(math.fsum(values))
+        per_sample.append(values)
+
+    result = {}
+    for c, name in enumerate(COLUMNS):
+        values = sorted(float(sample[c]) for sample in per_sample)
+        result[name] = {'mean': math.fsum(values) / len(values),
+                        'low': _quantile(values, tail), 'high': _quantile(values, 1 - tail)}
+    return result
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
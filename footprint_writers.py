@@ -0,0 +1,244 @@
+# Part 17
+# Bulk buffered writers of results
+# Author: Yian Bian 260886212
+
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import math
+import os
+import sys
+import tempfile
+from array import array
+
+from footprint_model import CATEGORY_NAMES
+from footprint_columnar import write_columnar
+
+COLUMNS = CATEGORY_NAMES + ['Total']
+BUFFER_ROWS = 65536
+COMPRESSORS = {'gz': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+
+
+#################################################
+
+def open_output(fname, compression=None):
+    '''(str, str) -> file
+    Open fname for writing bytes, through the compressor named by
+    compression ('gz', 'bz2' or 'xz') if any, or standard output for '-'.'''
+    if fname == '-':
+        return sys.stdout.buffer
+    if compression is None:
+        return open(fname, 'wb')
+    if compression not in COMPRESSORS:
+        raise ValueError('unknown compression ' + compression)
+    return COMPRESSORS[compression](fname, 'wb')
+
+
+def total(results):
+    '''(lst) -> float
+    Return the sum of results, skipping sections left empty.
+
+    >>> total([1.5, '', 2.5])
+    4.0
+    '''
+    return math.fsum(r for r in results if r != '')
+
+
+class ResultWriter:
+    '''Write the results of many people to fname, one row per person with
+    the six categories and their total. Rows are collected and written
+    BUFFER_ROWS at a time, so the file sees a few large writes instead of
+    one per person. Use as a context manager, or call close(). Every
+    format defines _write_rows(rows), writing a list of (header, results)
+    to its file.'''
+
+    def __init__(self, fname, compression=None):
+        self.fname = fname
+        self.compression = compression
+        self.rows = 0
+        self.pending = []
+
+    def write(self, header, results):
+        '''(ResultWriter, str, lst) -> NoneType
+        Write the results of the person with header.'''
+        self.pending.append((header, results))
+        if len(self.pending) >= BUFFER_ROWS:
+            self.flush()
+
+    def write_all(self, records):
+        '''(ResultWriter, iterable of (str, lst)) -> int
+        Write every (header, results) in records, as yielded by
+        calculate_footprints_from_stream. Return the number of rows
+        written so far.'''
+        for header, results in records:
+            self.write(header, results)
+        return self.rows + len(self.pending)
+
+    def flush(self):
+        '''(ResultWriter) -> NoneType
+        Write the pending rows.'''
+        if self.pending:
+            self._write_rows(self.pending)
+            self.rows += len(self.pending)
+            self.pending = []
+
+    def close(self):
+        '''(ResultWriter) -> NoneType
+        Write the pending rows and close the file.'''
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TextResultWriter(ResultWriter):
+    '''A ResultWriter to a byte stream: a file name (see open_output) or
+    an already open binary file, which is left open.'''
+
+    def __init__(self, fname, compression=None):
+        ResultWriter.__init__(self, fname, compression)
+        self.owned = not hasattr(fname, 'write') and fname != '-'
+        self.out = fname if hasattr(fname, 'write') else open_output(fname, compression)
+
+    def close(self):
+        ResultWriter.close(self)
+        if self.owned:
+            self.out.close()
+        else:
+            self.out.flush()
+
+
+class CSVResultWriter(TextResultWriter):
+    '''Write results as CSV with a header row, leaving empty sections blank.
+
+    >>> out = io.BytesIO()
+    >>> with CSVResultWriter(out) as w:
+    ...     w.write('Alice', [1.0, 2.0, '', 0.5, 0.0, 3.0])
+    >>> print(out.getvalue().decode(), end='')
+    person,Utilities,University,Computing,Diet,Transportation,Travel,Total
+    Alice,1.0,2.0,,0.5,0.0,3.0,6.5
+    '''
+
+    def __init__(self, fname, compression=None):
+        TextResultWriter.__init__(self, fname, compression)
+        self.out.write((','.join(['person'] + COLUMNS) + '\n').encode())
+
+    def _write_rows(self, rows):
+        text = io.StringIO()
+        writer = csv.writer(text, lineterminator='\n')
+        writer.writerows([header] + results + [total(results)] for header, results in rows)
+        self.out.write(text.getvalue().encode())
+
+
+class JSONLinesResultWriter(TextResultWriter):
+    '''Write results as JSON Lines, one object per person, with null for
+    empty sections.
+
+    >>> out = io.BytesIO()
+    >>> with JSONLinesResultWriter(out) as w:
+    ...     w.write('Alice', [1.0, 2.0, '', 0.5, 0.0, 3.0])
+    >>> print(out.getvalue().decode(), end='')
+    {"person": "Alice", "Utilities": 1.0, "University": 2.0, "Computing": null, "Diet": 0.5, "Transportation": 0.0, "Travel": 3.0, "Total": 6.5}
+    '''
+
+    def _write_rows(self, rows):
+        dumps = json.dumps
+        lines = []
+        for header, results in rows:
+            row = {'person': header}
+            row.update(zip(CATEGORY_NAMES, [None if r == '' else r for r in results]))
+            row['Total'] = total(results)
+            lines.append(dumps(row))
+        self.out.write(('\n'.join(lines) + '\n').encode())
+
+
+class ColumnarResultWriter(ResultWriter):
+    '''Write results in the binary columnar format of footprint_columnar:
+    one float64 column per category plus Total, nan for empty sections,
+    readable back with ColumnarPopulation. Rows keep input order; the
+    person headers are not stored. Columns are spilled to temporary files
+    as they fill, and the file is not compressed so it can be memory-mapped.
+    '''
+
+    def __init__(self, fname, compression=None):
+        if compression is not None:
+            raise ValueError('columnar files are not compressed, so that they can be memory-mapped')
+        ResultWriter.__init__(self, fname)
+        self.spills = [tempfile.TemporaryFile() for name in COLUMNS]
+
+    def _write_rows(self, rows):
+        nan = math.nan
+        columns = [array('d', [nan if r == '' else r for r in values])
+                   for values in zip(*[results for header, results in rows])]
+        columns.append(array('d', [total(results) for header, results in rows]))
+        for column, out in zip(columns, self.spills):
+            if sys.byteorder != 'little':
+                column.byteswap()
+            column.tofile(out)
+
+    def close(self):
+        ResultWriter.close(self)
+        try:
+            write_columnar(self.fname, self.spills, self.rows, COLUMNS, [])
+        finally:
+            for out in self.spills:
+                out.close()
+
+
+WRITERS = {'csv': CSVResultWriter, 'jsonl': JSONLinesResultWriter, 'fpc': ColumnarResultWriter}
+
+
+def output_format(fname):
+    '''(str) -> (str, str)
+    Return the format and the compression (None if uncompressed) the file
+    name of path fname ends with, 'csv' when it has no extension.
+
+    >>> output_format('/data/v1.2/results.jsonl.gz'), output_format('./results')
+    (('jsonl', 'gz'), ('csv', None))
+    '''
+    root, ext = os.path.splitext(os.path.basename(fname))
+    compression = None
+    if ext[1:] in COMPRESSORS:
+        compression = ext[1:]
+        root, ext = os.path.splitext(root)
+    return (ext[1:] or 'csv'), compression
+
+
+def open_writer(fname, format=None, compression=None):
+    '''(str, str, str) -> ResultWriter
+    Return a writer of results to fname. format ('csv', 'jsonl' or 'fpc'
+    for the binary columnar format) and compression default to what the
+    file name ends with, e.g. 'results.jsonl.gz'.
+
+    >>> type(open_writer(os.devnull, 'jsonl')).__name__
+    'JSONLinesResultWriter'
+    '''
+    guessed, suffix = output_format(fname)
+    if compression is None:
+        compression = suffix
+    if format is None:
+        format = guessed
+    if format not in WRITERS:
+        raise ValueError('unknown format ' + format)
+    return WRITERS[format](fname, compression)
+
+
+def write_results(records, fname, format=None, compression=None):
+    '''(iterable of (str, lst), str, str, str) -> int
+    Write every (header, results) in records to fname (see open_writer)
+    and return the number of people written.'''
+    with open_writer(fname, format, compression) as writer:
+        return writer.write_all(records)
+
+
+#################################################
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -2,13 +2,124 @@
 # Unit Conversion
 # Author: Yian Bian2 60886212
 
-import doctest
+from array import array
+from collections import deque
 
 POUND_IN_KG = 0.45359237
 KM_IN_MILES = 0.621371
 DAYS_IN_YEAR = 365.2425
 
 
+class UnitRegistry:
+    '''Units as a graph whose edges are conversion factors. The factor
+    between any two connected units, including rates such as 'g/week' to
+    't/year', is found once by walking the graph and then cached.
+
+    >>> units = UnitRegistry()
+    >>> units.define('kg', 1000, 'g')
+    >>> units.define('t', 1000, 'kg')
+    >>> units.factor('t', 'g')
+    1000000
+    >>> units.define('week', 7, 'day')
+    >>> units.factor('g/week', 'kg/day')
+    0.00014285714285714287
+    '''
+
+    def __init__(self):
+        self.edges = {}
+        self.cache = {}
+
+    def define(self, unit, amount, other):
+        '''(UnitRegistry, str, num, str) -> NoneType
+        Declare that 1 unit is amount other.'''
+        self.edges.setdefault(unit, {})[other] = amount
+        self.edges.setdefault(other, {})[unit] = 1 / amount
+        self.cache.clear()
+
+    def _simple_factor(self, from_unit, to_unit):
+        '''(UnitRegistry, str, str) -> num
+        Return how many to_unit make 1 from_unit, walking the graph
+        breadth first.'''
+        if from_unit == to_unit:
+            return 1
+        if from_unit not in self.edges or to_unit not in self.edges:
+            raise ValueError('unknown unit ' + (to_unit if from_unit in self.edges else from_unit))
+        factors = {from_unit: 1}
+        todo = deque([from_unit])
+        while todo:
+            unit = todo.popleft()
+            for other, amount in self.edges[unit].items():
+                if other not in factors:
+                    factors[other] = factors[unit] * amount
+                    if other == to_unit:
+                        return factors[other]
+                    todo.append(other)
+        raise ValueError('cannot convert ' + from_unit + ' to ' + to_unit)
+
+    def factor(self, from_unit, to_unit):
+        '''(UnitRegistry, str, str) -> num
+        Return the number to multiply a value in from_unit by to get it in
+        to_unit. Units may be rates written 'numerator/denominator'.'''
+        key = (from_unit, to_unit)
+        factor = self.cache.get(key)
+        if factor is None:
+            from_num, _, from_den = from_unit.partition('/')
+            to_num, _, to_den = to_unit.partition('/')
+            if bool(from_den) != bool(to_den):
+                raise ValueError('cannot convert ' + from_unit + ' to ' + to_unit)
+            factor = self._simple_factor(from_num, to_num)
+            if from_den:
+                factor = factor / self._simple_factor(from_den, to_den)
+            self.cache[key] = factor
+        return factor
+
+    def convert(self, value, from_unit, to_unit):
+        '''(num or seq, str, str) -> num or seq
+        Convert value from from_unit to to_unit. value is a number, or a
+        sequence of numbers converted in one pass (a numpy array stays a
+        numpy array, an array.array or memoryview gives an array of
+        doubles, anything else a list).'''
+        return scale(value, self.factor(from_unit, to_unit))
+
+
+def scale(value, factor):
+    '''(num or seq, num) -> num or seq
+    Return value multiplied by factor, element by element for a sequence.
+
+    >>> scale([1, 2], 0.5)
+    [0.5, 1.0]
+    >>> scale(array('d', [1, 2]), 2)
+    array('d', [2.0, 4.0])
+    '''
+    if isinstance(value, (int, float)) or hasattr(value, 'dtype'): # numbers and numpy arrays
+        return value * factor
+    if isinstance(value, (array, memoryview)):
+        return array('d', [x * factor for x in value])
+    return [x * factor for x in value]
+
+
+UNITS = UnitRegistry()
+UNITS.define('kg', 1000, 'g')
+UNITS.define('t', 1000, 'kg')
+UNITS.define('lb', POUND_IN_KG, 'kg')
+UNITS.define('km', KM_IN_MILES, 'mile')
+UNITS.define('MWh', 1000, 'kWh')
+UNITS.define('week', 7, 'day')
+UNITS.define('day', 24, 'hour')
+UNITS.define('year', DAYS_IN_YEAR, 'day')
+UNITS.define('year', 12, 'month')
+
+# The factors of the helpers below, found once so that converting a single
+# number is one type check and one multiplication.
+_NUMBERS = (int, float)
+_KG_TO_T = UNITS.factor('kg', 't')
+_LB_TO_KG = UNITS.factor('lb', 'kg')
+_KM_TO_MILE = UNITS.factor('km', 'mile')
+_DAILY_TO_ANNUAL = UNITS.factor('1/day', '1/year')
+_WEEKLY_TO_ANNUAL = UNITS.factor('1/week', '1/year')
+_ANNUAL_TO_DAILY = UNITS.factor('1/year', '1/day')
+
+
 def kg_to_tonnes(kg):
     '''(num) -> float
     Convert mass in kg to in metric tonnes. 1000 kg = 1 tonne.
@@ -18,9 +129,12 @@ def kg_to_tonnes(kg):
     0.723
     >>> round(kg_to_tonnes(0.5), 4)
     0.0005
+    >>> kg_to_tonnes([0, 723])
+    [0.0, 0.723]
     '''
-    kg_to_tonnes = kg / 1000
-    return kg_to_tonnes
+    if type(kg) in _NUMBERS:
+        return kg * _KG_TO_T
+    return scale(kg, _KG_TO_T)
 
 
 def pound_to_kg(lbs):
@@ -33,8 +147,9 @@ def pound_to_kg(lbs):
     >>> round(pound_to_kg(23), 4)
     10.4326
     '''
-    pound_to_kg = lbs * POUND_IN_KG
-    return pound_to_kg
+    if type(lbs) in _NUMBERS:
+        return lbs * _LB_TO_KG
+    return scale(lbs, _LB_TO_KG)
 
 
 def km_to_miles(km):
@@ -47,8 +162,9 @@ def km_to_miles(km):
     >>> round(km_to_miles(5), 4)
     3.1069
     '''
-    km_to_miles = km * KM_IN_MILES
-    return km_to_miles
+    if type(km) in _NUMBERS:
+        return km * _KM_TO_MILE
+    return scale(km, _KM_TO_MILE)
 
 
 def daily_to_annual(daily_value):
@@ -62,8 +178,9 @@ def daily_to_annual(daily_value):
     >>> round(daily_to_annual(1000), 4)
     365242.5
     '''
-    daily_to_annual = daily_value * DAYS_IN_YEAR
-    return daily_to_annual
+    if type(daily_value) in _NUMBERS:
+        return daily_value * _DAILY_TO_ANNUAL
+    return scale(daily_value, _DAILY_TO_ANNUAL)
 
 
 def weekly_to_annual(w):
@@ -78,8 +195,9 @@ def weekly_to_annual(w):
     >>> round(weekly_to_annual(1.25), 4)
     65.2219
     '''
-    weekly_to_annual = w * 52.1775
-    return weekly_to_annual
+    if type(w) in _NUMBERS:
+        return w * _WEEKLY_TO_ANNUAL
+    return scale(w, _WEEKLY_TO_ANNUAL)
 
 
 def annual_to_daily(annual_value):
@@ -92,10 +210,12 @@ def annual_to_daily(annual_value):
     >>> round(annual_to_daily(356), 4)
     0.9747
     '''
-    daily_value = annual_value / DAYS_IN_YEAR
-    return daily_value
+    if type(annual_value) in _NUMBERS:
+        return annual_value * _ANNUAL_TO_DAILY
+    return scale(annual_value, _ANNUAL_TO_DAILY)
 
 
 
 if __name__ == '__main__':
+    import doctest
     doctest.testmod()